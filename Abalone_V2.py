@@ -1,117 +1,821 @@
-import math 
+import math
 import time
-import copy
 import random
+import logging
+import threading
+from collections import namedtuple
+from transposition import TranspositionTable, EvaluationCache, zobristKey, deltaKey, ZOBRIST_TURN, ZOBRIST_MAXIMIZER, EXACT, LOWER, UPPER
 
-moves = {
-    "NW":[-1, -1],
-    "NE":[-1,  0],
-    "E" :[ 0,  1],
-    "SW":[ 1,  0],
-    "SE":[ 1,  1],
-    "W" :[ 0, -1]
-}
-
-"""
-    ...
-"""
-node_count=0
+from hexgrid import moves, onBoard, CELLS, FULL, AXIS, CENTER_DISTANCE, DISTANCE_SCALE, DISTANCE_UNITS, NEIGHBOUR_MASKS, DIRECTIONS, BROADSIDES, LINES, shift, bits, coordinates
 
-def minimax(state, depth, maximizer, turn, alpha, beta):
-    move = -1
-    
-    if state.is_terminal():        
-        return (-math.inf if maximizer else math.inf), -1
-    elif depth == 0:         
-        return heuristic(state, turn), -1
-
-    if maximizer:       
-        score = -math.inf
-        # x est l'ancien score, on souhaite savoir si l'ancien score est plus grand que le meilleur score pour maximizer = True
-        def shouldReplace(x): return x > score
-    else:
-        score = math.inf
-        # x est l'ancien score, on souhaite savoir si l'ancien score est mieux classé (donc plus petit) que le meilleur score pour maximizer = False
-        def shouldReplace(x): return x < score
+try:
+    import evaluation
+except ImportError:
+    # sans numpy, chaque enfant est évalué après son move
+    evaluation = None
 
-    successors = state.legal_plays(turn) #maximizer c'est le turn
-    boards = []
+class Move(namedtuple("Move", "maximizer marbles direction mineDelta opponentDelta")):
+    """
+        A move of one player : the mask of the chain, the direction and the xor masks to play it.
+    """
+    __slots__ = ()
 
-    # state.displayBoard()
+    def chain(self):
+        return coordinates(self.marbles)
+
+    def isPush(self):
+        return self.opponentDelta != 0
+
+    def isEjection(self):
+        # the pushed line only loses its first box when its last marble falls off the board
+        return self.opponentDelta.bit_count() == 1
+
+    def toJSON(self):
+        return {"marbles": self.chain(), "direction": self.direction}
+
+# les cases du plateau en "1" et les autres en "0", pour lire un masque dans la grille aplatie
+WHITE_BITS = str.maketrans("WBEX", "1000")
+BLACK_BITS = str.maketrans("WBEX", "0100")
+
+def gridMasks(grid):
+    """
+        (white, black) masks of the server's 9x9 grid, read by int() from the flattened grid instead of box by box.
     """
-        On va parcourir l'ensemble des moves possibles
-        Pour chaque move possible, le sélectionner et rappeler la fonction minimax mais avec l'autre joueur et en enlevant 1 de profondeur
-        Idem pour la 3ème couche
+    # le bit i*9 + j est le caractère i*9 + j de la grille aplatie, int() lit le bit 0 à droite
+    flat = "".join(map("".join, grid))[::-1]
+    return int(flat.translate(WHITE_BITS), 2), int(flat.translate(BLACK_BITS), 2)
 
+class Position:
+    """
+        Immutable position : the masks of the white and black marbles and the player to move (True for white).\n
+        Hashable and compared by value, it is the key of dicts and sets and what is sent to other processes :
+        it pickles as its three fields only.
     """
+    __slots__ = ("white", "black", "turn", "hash")
 
-    if depth == 3:
-        print("<<<< FIRST DEPTH >>>>")
-    elif depth == 2:
-        print("____ second depth ___")
-    elif depth == 1:
-        print("...")
+    def __init__(self, white, black, turn):
+        object.__setattr__(self, "white", white)
+        object.__setattr__(self, "black", black)
+        object.__setattr__(self, "turn", turn)
+        object.__setattr__(self, "hash", hash((white, black, turn)))
 
-    R_successors = reversed(successors)
+    def __setattr__(self, name, value):
+        raise AttributeError("a Position is immutable")
 
-    # for s in R_successors:
-    #     print(s)
+    def __hash__(self):
+        return self.hash
 
-    for successor in R_successors:
-        # print(successor)     
-        global node_count # permet de modifier une variable publique
-        node_count += 1
+    def __eq__(self, other):
+        return (isinstance(other, Position) and self.white == other.white
+                and self.black == other.black and self.turn == other.turn)
 
-        moveName = successor
+    def __reduce__(self):
+        return Position, (self.white, self.black, self.turn)
 
-        copyBoard = copy.deepcopy(state.board)
-        newState = Board(copyBoard)
+    def __repr__(self):
+        return f"Position(white={self.white:#x}, black={self.black:#x}, turn={self.turn})"
 
-        newState.action(moveName[0], moveName[1], turn, True)  
-        tempoScore = minimax(newState, depth - 1, not maximizer, not turn, alpha, beta)[0]
+    @classmethod
+    def fromGrid(cls, grid, turn):
+        return cls(*gridMasks(grid), turn)
 
-        if shouldReplace(tempoScore):
-            # print("COCO CHANNEL COCO :", moveName)
-            score = tempoScore
-            move = moveName
+    def toGrid(self):
+        return Board(self.white, self.black).toGrid()
+
+    def board(self):
+        return Board(self.white, self.black)
+
+logger = logging.getLogger("abalone")
+
+node_count=0
+
+class SearchTimeout(Exception):
+    pass
+
+def tableKey(state, maximizer, turn):
+    """
+        Key of a node in the transposition table : the position, the player to move and the player who maximizes.
+    """
+    key = state.key
+    if turn:
+        key ^= ZOBRIST_TURN
+    if maximizer:
+        key ^= ZOBRIST_MAXIMIZER
+    return key
+
+# killer moves and node counts are kept for this many plies from the root
+MAX_PLY = 64
+# width of the null window of the principal variation search, the scores are floats
+NULL_WINDOW = 1e-6
+# half width of the window around the score of the previous iteration
+ASPIRATION = 25
+# longest ponder, in seconds, when no search stops it
+PONDER_TIME = 30
+# depth removed by the null move, on top of the ply it passes
+NULL_REDUCTION = 2
+# no null move for a player with this many marbles or fewer : passing would hide the pushes that end the game
+NULL_MOVE_MARBLES = 10
+# the quiet moves after this many moves are searched one ply shallower first
+LATE_MOVES = 4
+# the children of a node of depth 1 are evaluated together once this many moves did not cut
+BATCH_AFTER = 1
+
+class SearchStats:
+    """
+        Counters of one search, returned by iterativeDeepening and logged once per move.
+    """
+    def __init__(self):
+        self.nodes = [0] * MAX_PLY # nodes visited at each ply
+        self.expanded = 0 # nodes whose moves were generated
+        self.cutoffs = 0
+        self.probes = 0
+        self.hits = 0
+        self.evaluations = 0
+        self.researches = 0 # null windows that failed high, reduced moves searched again and aspiration windows that failed
+        self.quiescence = 0 # nodes of the quiescence search, also counted in nodes
+        self.cacheHits = 0 # positions of the quiescence search found in the evaluation cache
+        self.cacheMisses = 0
+        self.nullCutoffs = 0 # nodes cut by a null move
+        self.iterations = [] # (depth, seconds) of each completed iteration
+        self.start = time.time()
+
+    def add(self, other):
+        """
+            Adds the counters of another search, the one of a worker of the parallel search.
+        """
+        self.nodes = [mine + theirs for mine, theirs in zip(self.nodes, other.nodes)]
+        self.expanded += other.expanded
+        self.cutoffs += other.cutoffs
+        self.probes += other.probes
+        self.hits += other.hits
+        self.evaluations += other.evaluations
+        self.researches += other.researches
+        self.quiescence += other.quiescence
+        self.cacheHits += other.cacheHits
+        self.cacheMisses += other.cacheMisses
+        self.nullCutoffs += other.nullCutoffs
+
+    def totalNodes(self):
+        return sum(self.nodes)
+
+    def branchingFactor(self):
+        # every node except the root is the child of an expanded node
+        return (self.totalNodes() - self.nodes[0]) / self.expanded if self.expanded else 0
+
+    def hitRate(self):
+        return self.hits / self.probes if self.probes else 0
+
+    def cacheHitRate(self):
+        probes = self.cacheHits + self.cacheMisses
+        return self.cacheHits / probes if probes else 0
+
+    def elapsed(self):
+        return time.time() - self.start
+
+    def nps(self):
+        elapsed = self.elapsed()
+        return self.totalNodes() / elapsed if elapsed > 0 else 0
+
+    def toJSON(self):
+        depth = len(self.nodes)
+        while depth > 0 and self.nodes[depth - 1] == 0:
+            depth -= 1
+        return {
+            "nodes": self.totalNodes(),
+            "nodesPerPly": self.nodes[:depth],
+            "cutoffs": self.cutoffs,
+            "branchingFactor": round(self.branchingFactor(), 2),
+            "hitRate": round(self.hitRate(), 3),
+            "cacheHitRate": round(self.cacheHitRate(), 3),
+            "evaluations": self.evaluations,
+            "researches": self.researches,
+            "quiescence": self.quiescence,
+            "nullCutoffs": self.nullCutoffs,
+            "iterations": [[depth, round(seconds, 3)] for depth, seconds in self.iterations],
+            "nps": round(self.nps()),
+        }
+
+    def __str__(self):
+        iterations = " ".join(f"d{depth}:{seconds:.2f}s" for depth, seconds in self.iterations)
+        return (f"{self.totalNodes()} nodes, {self.nps():.0f} nps, {self.evaluations} evaluations, "
+                f"{self.cutoffs} cutoffs ({self.nullCutoffs} null move), {self.researches} re-searches, {self.quiescence} quiescence nodes, branching {self.branchingFactor():.1f}, tt hits {100 * self.hitRate():.1f}%, "
+                f"cache hits {100 * self.cacheHitRate():.1f}%, {iterations}")
+
+class Engine:
+    """
+        Search state kept from one move to the next during a game :\n
+        - the transposition table, the positions of two consecutive turns share most of their subtrees\n
+        - the killer moves, the last 2 quiet moves that caused a cutoff at each ply\n
+        - the history table, how often (weighted by depth) each quiet move caused a cutoff\n
+        Between two moves, ponder searches the replies the opponent is likely to play.
+    """
+    def __init__(self, table=None, **kwargs):
+        self.table = table if table is not None else TranspositionTable()
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = {}
+        self.stats = SearchStats()
+        # principal variation found below each ply by the last search, pv[0] is the one of the root
+        self.pv = [[] for _ in range(MAX_PLY + 1)]
+        # set to stop the pondering search, checked at every node like the deadline
+        self.stopped = False
+        # held while pondering, stopPondering waits for it before the next search uses the engine
+        self.pondering = threading.Lock()
+        self.ponderId = 0
+        # keys of the positions searched by the last ponder
+        self.ponderKeys = set()
+
+        # aux feuilles, on continue avec les poussées jusqu'à une position calme
+        self.quiescence = kwargs.get('quiescence', True)
+        self.quiescenceDepth = kwargs.get('quiescenceDepth', 6)
+        # marge de la delta pruning des poussées, None pour ne pas l'utiliser
+        self.delta = kwargs.get('delta', None)
+        # le joueur passe son tour : si c'est encore trop bien pour l'adversaire, pas besoin de chercher plus loin
+        self.nullMove = kwargs.get('nullMove', True)
+        # les moves calmes en fin de liste sont d'abord cherchés moins profond
+        self.reductions = kwargs.get('reductions', True)
+        # évaluations et poussées des feuilles, gardées d'une recherche à l'autre, None pour ne pas les garder
+        self.cache = kwargs.get('cache', evaluationCache)
+        # les enfants des noeuds de profondeur 1 sont tous évalués en un appel à evaluateMoves
+        self.batch = kwargs.get('batch', evaluation is not None)
+
+    def newSearch(self):
+        """
+            Called once per move played.
+        """
+        self.table.newSearch()
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        # les anciennes coupures comptent moins que celles de la position actuelle
+        self.history = {move: count // 2 for move, count in self.history.items() if count > 1}
+
+    def orderMoves(self, successors, bestMove=None, ply=0):
+        """
+            Sorts the moves in the order minimax tries them :\n
+            - the best move of the table\n
+            - the moves pushing a marble out of the board, then the other pushes\n
+            - the killer moves of the ply\n
+            - the other moves by history, the longest chains first when the history is equal (voir README)
+        """
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+        history = self.history
+
+        def priority(move):
+            if move == bestMove:
+                return 5, 0
+            if move.opponentDelta:
+                return (4 if move.opponentDelta.bit_count() == 1 else 3), move.marbles.bit_count()
+            if move == killers[0]:
+                return 2, 1
+            if move == killers[1]:
+                return 2, 0
+            return 1, history.get(move, 0) * 4 + move.marbles.bit_count()
+
+        # à priorité égale, les derniers moves générés passent en premier, cet ordre coupe plus souvent
+        successors.reverse()
+        successors.sort(key=priority, reverse=True)
+
+    def storeCutoff(self, move, depth, ply):
+        """
+            Remembers a quiet move that caused a cutoff, pushes are already tried first.
+        """
+        if move.opponentDelta:
+            return
+
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+    def minimax(self, state, depth, maximizer, turn, alpha, beta, deadline=None, ply=0, allowNull=True):
+        """
+            Principal variation search : the first move with the (alpha, beta) window, the others with a null
+            window that only tells whether they are better, searched again with (alpha, beta) when they are.\n
+            - Null move : below the root, the player passes and the opponent is searched NULL_REDUCTION plies
+              shallower, a score still beyond the window cuts the node (never two null moves in a row)\n
+            - Late move reductions : the quiet moves after the LATE_MOVES first ones are searched one ply
+              shallower, and at full depth when they turn out better\n
+            - Batch : at depth 1 the children are evaluated together, a child is not played when its evaluation
+              is already its score (a finished game, no quiescence or a stand pat beyond the window)\n
+            Only quiesce uses the evaluation cache : with quiescence=False, the leaves of depth 0 are evaluated
+            by heuristic every time, it costs less than a lookup.\n
+            Returns the score and the best move, the line of best moves is left in self.pv[ply].
+        """
+        move = -1
+        stats = self.stats
+        stats.nodes[ply] += 1
+        pv = self.pv
+        pv[ply] = []
+
+        if depth > 0 and (self.stopped or deadline is not None and time.time() > deadline):
+            raise SearchTimeout()
+
+        if state.is_terminal():
+            return (-math.inf if maximizer else math.inf), -1
+        elif depth == 0:
+            if self.quiescence:
+                return self.quiesce(state, maximizer, turn, alpha, beta, ply), -1
+            stats.evaluations += 1
+            # the score is always the one of the player who maximizes
+            return heuristic(state, turn if maximizer else not turn), -1
+
+        table = self.table
+        key = tableKey(state, maximizer, turn)
+
+        bestMove = None
+        entry = table.get(key)
+        stats.probes += 1
+        if entry is not None:
+            stats.hits += 1
+            if entry.depth >= depth:
+                if entry.bound == EXACT:
+                    if entry.move != -1:
+                        pv[ply] = [entry.move]
+                    return entry.score, entry.move
+                elif entry.bound == LOWER and entry.score >= beta:
+                    return entry.score, entry.move
+                elif entry.bound == UPPER and entry.score <= alpha:
+                    return entry.score, entry.move
+            bestMove = entry.move
+
+        if self.nullMove and allowNull and ply > 0 and depth > NULL_REDUCTION and state.count[turn] > NULL_MOVE_MARBLES:
+            # on passe son tour, avec une fenêtre nulle sur la borne que le joueur doit dépasser
+            if maximizer:
+                nullScore = self.minimax(state, depth - 1 - NULL_REDUCTION, False, not turn, beta - NULL_WINDOW, beta, deadline, ply + 1, False)[0]
+                if nullScore >= beta and nullScore != math.inf:
+                    stats.nullCutoffs += 1
+                    return nullScore, -1
+            else:
+                nullScore = self.minimax(state, depth - 1 - NULL_REDUCTION, True, not turn, alpha, alpha + NULL_WINDOW, deadline, ply + 1, False)[0]
+                if nullScore <= alpha and nullScore != -math.inf:
+                    stats.nullCutoffs += 1
+                    return nullScore, -1
+
+        alphaOrigin = alpha
+        betaOrigin = beta
 
         if maximizer:
-            alpha = max(alpha, tempoScore)
+            score = -math.inf
+            # x est l'ancien score, on souhaite savoir si l'ancien score est plus grand que le meilleur score pour maximizer = True
+            def shouldReplace(x): return x > score
         else:
-            beta = min(beta, tempoScore)
-        
-        if alpha >= beta:
-            break
+            score = math.inf
+            # x est l'ancien score, on souhaite savoir si l'ancien score est mieux classé (donc plus petit) que le meilleur score pour maximizer = False
+            def shouldReplace(x): return x < score
+
+        successors = state.legal_plays(turn) #maximizer c'est le turn
+        self.orderMoves(successors, bestMove, ply)
+        stats.expanded += 1
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+        reduce = self.reductions and depth >= 3
 
-        # print(score, move)
+        batch = depth == 1 and self.batch
+        leaves = None
 
-    return score, move
+        """
+            On va parcourir l'ensemble des moves possibles
+            Pour chaque move possible, le sélectionner et rappeler la fonction minimax mais avec l'autre joueur et en enlevant 1 de profondeur
+        """
 
-def heuristic(state, maximizer):    
-    result = 0
-    print(state.population(maximizer))
-    print(state.closeCenter(maximizer))
+        for index, successor in enumerate(successors):
+            global node_count # permet de modifier une variable publique
+            node_count += 1
 
-    result += state.population(maximizer)
+            moveName = successor
 
-    
-    if state.winner(maximizer) == True:
-        result += 200
-    elif state.winner(maximizer) == False:
-        result -= 200
+            if batch and index == BATCH_AFTER:
+                # assez de moves essayés sans coupure, les autres enfants seront sans doute tous cherchés
+                leaves, finished = evaluateMoves(state, successors, turn if maximizer else not turn)
+                stats.evaluations += len(successors)
 
-    result +=  state.closeCenter(maximizer)
-    #print(state.closeCenter(maximizer))
+            if leaves is not None and (finished[index] or not self.quiescence
+                                       or (leaves[index] <= alpha if maximizer else leaves[index] >= beta)):
+                # le score que donnerait la feuille, déjà calculé avec ceux des autres enfants
+                stats.nodes[ply + 1] += 1
+                pv[ply + 1] = []
+                tempoScore = (math.inf if maximizer else -math.inf) if finished[index] else leaves[index]
+            else:
+                # on joue le move sur le même plateau et on le défait après la recherche, plus besoin de copier le plateau
+                undo = state.make_move(moveName)
+                if index == 0:
+                    tempoScore = self.minimax(state, depth - 1, not maximizer, not turn, alpha, beta, deadline, ply + 1)[0]
+                else:
+                    # les moves calmes tardifs sont d'abord cherchés un coup moins profond
+                    late = reduce and index >= LATE_MOVES and not moveName.opponentDelta and moveName != bestMove and moveName not in killers
+                    reduced = depth - 2 if late else depth - 1
+                    # fenêtre nulle : on vérifie seulement que le move ne fait pas mieux que le meilleur déjà trouvé,
+                    # un score à moins de NULL_WINDOW de la borne est une égalité, pas un move meilleur
+                    if maximizer:
+                        tempoScore = self.minimax(state, reduced, False, not turn, alpha, alpha + NULL_WINDOW, deadline, ply + 1)[0]
+                        if late and tempoScore >= alpha + NULL_WINDOW:
+                            stats.researches += 1
+                            tempoScore = self.minimax(state, depth - 1, False, not turn, alpha, alpha + NULL_WINDOW, deadline, ply + 1)[0]
+                        better = alpha + NULL_WINDOW <= tempoScore < beta
+                    else:
+                        tempoScore = self.minimax(state, reduced, True, not turn, beta - NULL_WINDOW, beta, deadline, ply + 1)[0]
+                        if late and tempoScore <= beta - NULL_WINDOW:
+                            stats.researches += 1
+                            tempoScore = self.minimax(state, depth - 1, True, not turn, beta - NULL_WINDOW, beta, deadline, ply + 1)[0]
+                        better = alpha < tempoScore <= beta - NULL_WINDOW
+                    if better:
+                        stats.researches += 1
+                        tempoScore = self.minimax(state, depth - 1, not maximizer, not turn, alpha, beta, deadline, ply + 1)[0]
+                state.unmake_move(undo)
+
+            if shouldReplace(tempoScore):
+                score = tempoScore
+                move = moveName
+                pv[ply] = [moveName] + pv[ply + 1]
+
+            if maximizer:
+                alpha = max(alpha, tempoScore)
+            else:
+                beta = min(beta, tempoScore)
+
+            if alpha >= beta:
+                stats.cutoffs += 1
+                self.storeCutoff(moveName, depth, ply)
+                break
+
+        if move == -1 and successors:
+            # toutes les suites sont perdantes, on joue quand même le premier move essayé
+            move = successors[0]
+            pv[ply] = [move]
+
+        if score <= alphaOrigin:
+            bound = UPPER
+        elif score >= betaOrigin:
+            bound = LOWER
+        else:
+            bound = EXACT
+        table.put(key, depth, score, bound, move)
 
-    result += state.winning(maximizer)
+        return score, move
 
-    return result
+    def quiesce(self, state, maximizer, turn, alpha, beta, ply, depth=0):
+        """
+            Score of a leaf of minimax once the position is quiet : only the pushes are searched, and the player
+            to move may stand pat on the evaluation since it could play a quiet move instead.\n
+            With delta, the pushes that cannot bring the score back into the window are skipped : an ejection
+            may gain WINNING and delta, another push only delta. The ejections ending the game are always searched.\n
+            The evaluation and the sorted pushes of the position are kept in the cache.
+        """
+        stats = self.stats
+
+        if state.is_terminal():
+            return -math.inf if maximizer else math.inf
+
+        cache = self.cache
+        key = tableKey(state, maximizer, turn)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            stats.cacheHits += 1
+            standPat, pushes = cached
+        else:
+            if cache is not None:
+                stats.cacheMisses += 1
+            stats.evaluations += 1
+            # the score is always the one of the player who maximizes
+            standPat = heuristic(state, turn if maximizer else not turn)
+            pushes = None
+            if cache is not None:
+                cache.put(key, standPat)
+        if depth >= self.quiescenceDepth or ply >= MAX_PLY - 1:
+            return standPat
+
+        if maximizer:
+            if standPat >= beta:
+                return standPat
+            alpha = max(alpha, standPat)
+        else:
+            if standPat <= alpha:
+                return standPat
+            beta = min(beta, standPat)
+
+        if pushes is None:
+            pushes = list(state.generateMoves(turn, quiet=False))
+            # les sorties de billes d'abord, puis les chaînes les plus longues
+            pushes.sort(key=lambda move: (move.opponentDelta.bit_count() == 1, move.marbles.bit_count()), reverse=True)
+            if cache is not None:
+                cache.put(key, standPat, pushes)
+        if pushes:
+            stats.expanded += 1
+
+        score = standPat
+        delta = self.delta
+        for push in pushes:
+            ejection = push.opponentDelta.bit_count() == 1
+            if delta is not None and not (ejection and state.count[not turn] <= 9):
+                if maximizer and standPat + (WINNING if ejection else 0) + delta <= alpha:
+                    continue
+                if not maximizer and standPat - delta >= beta:
+                    continue
+
+            stats.nodes[ply + 1] += 1
+            stats.quiescence += 1
+            undo = state.make_move(push)
+            value = self.quiesce(state, not maximizer, not turn, alpha, beta, ply + 1, depth + 1)
+            state.unmake_move(undo)
+
+            if maximizer:
+                score = max(score, value)
+                alpha = max(alpha, value)
+            else:
+                score = min(score, value)
+                beta = min(beta, value)
+            if alpha >= beta:
+                stats.cutoffs += 1
+                break
+
+        return score
+
+    def aspirationSearch(self, state, depth, turn, guess=None, deadline=None):
+        """
+            Searches the root with a window of ASPIRATION around guess, the score of the previous iteration.\n
+            When the score falls outside, the side of the window it crossed is opened and the root searched again.
+        """
+        if guess is None or guess == math.inf or guess == -math.inf:
+            return self.minimax(state, depth, True, turn, -math.inf, math.inf, deadline)
+
+        alpha = guess - ASPIRATION
+        beta = guess + ASPIRATION
+        while True:
+            score, move = self.minimax(state, depth, True, turn, alpha, beta, deadline)
+            if score <= alpha and alpha != -math.inf:
+                alpha = -math.inf
+            elif score >= beta and beta != math.inf:
+                beta = math.inf
+            else:
+                return score, move
+            self.stats.researches += 1
+
+    def principalVariation(self, state, turn, depth):
+        """
+            Line of best moves of the last search from the root, completed with the moves of the table
+            where the search stopped early (a position found in the table keeps only its first move).
+        """
+        pv = list(self.pv[0])
+        board = state.copy()
+        for move in pv:
+            board.make_move(move)
+
+        while len(pv) < depth and not board.is_terminal():
+            # la racine maximise, le joueur qui maximise et le joueur qui doit jouer alternent ensemble
+            ply = len(pv)
+            side = turn if ply % 2 == 0 else not turn
+            entry = self.table.get(tableKey(board, ply % 2 == 0, side))
+            if entry is None or entry.move == -1 or entry.move not in board.generateMoves(side):
+                break
+            pv.append(entry.move)
+            board.make_move(entry.move)
+        return pv
+
+    def iterativeDeepening(self, state, turn, budget, maxDepth=30, pool=None):
+        """
+            Searches depth 1, 2, 3... until the time budget (in seconds) is spent.\n
+            Each iteration leaves its best moves in the table, they are tried first by the next one,
+            and starts with an aspiration window around the score of the previous one.\n
+            With a pool (parallel.RootParallelSearch), the root moves are shared between its processes.\n
+            Returns the score and the move of the last completed iteration, its depth, the SearchStats
+            and its principal variation (our move then the expected replies).
+        """
+        deadline = time.time() + budget
+        self.stats = stats = SearchStats()
+        # the search is stopped by an exception, it must not leave a move played on the caller's board
+        board = state.copy()
+
+        successors = board.legal_plays(turn)
+        if len(successors) <= 1:
+            move = successors[0] if successors else -1
+            return 0, move, 0, stats, successors[:1]
+
+        score = -math.inf
+        move = max(successors, key=lambda successor: successor.marbles.bit_count())
+        pv = [move]
+        completed = 0
+
+        for depth in range(1, maxDepth + 1):
+            begin = time.time()
+            try:
+                if pool is None:
+                    score, move = self.aspirationSearch(board, depth, turn, score if depth > 1 else None, deadline)
+                    pv = self.principalVariation(board, turn, depth) or [move]
+                else:
+                    score, move = pool.search(board, depth, turn, deadline, self)
+                    pv = [move]
+            except SearchTimeout:
+                break
+            completed = depth
+            stats.iterations.append((depth, time.time() - begin))
+
+            if score == math.inf or score == -math.inf:
+                # the end of the game is within reach, searching deeper will not change the result
+                break
+
+        logger.info("depth %d, score %s, pv %s, %s", completed, score,
+                    " ".join(f"{coordinates(line.marbles)}{line.direction}" for line in pv), stats)
+        return score, move, completed, stats, pv
+
+    def ponder(self, state, turn, pv, ponderId, timeLimit=PONDER_TIME, depthLimit=4, replies=3, maxDepth=30):
+        """
+            Searches on the opponent's time, after our move pv[0] has been sent.\n
+            The opponent's replies are tried in the order of the table, the reply of the principal variation first,
+            each of the first ones is searched up to depthLimit, then the first one deeper until stopPondering,
+            maxDepth or timeLimit seconds : a ponder nobody stops (the game is over) ends by itself.\n
+            The search only fills the table, the killers and the history : the next iterativeDeepening
+            finds its first iterations in the table when the position is one of the pondered ones.\n
+            ponderId is the one read when the ponder was scheduled, a ponder started after a newer search does nothing.
+        """
+        with self.pondering:
+            if ponderId != self.ponderId:
+                return
+            deadline = time.time() + timeLimit
+            # the pondered positions are the ones of the next move
+            self.newSearch()
+            self.stats = stats = SearchStats()
+            self.ponderKeys = set()
+            board = state.copy()
+            board.make_move(pv[0])
+            if board.is_terminal():
+                return
+
+            if len(pv) > 1:
+                expected = pv[1]
+            else:
+                entry = self.table.get(tableKey(board, False, not turn))
+                expected = entry.move if entry is not None else None
+            successors = board.legal_plays(not turn)
+            self.orderMoves(successors, expected, 1)
+            successors = successors[:replies]
+
+            # every likely reply gets depthLimit, then the most likely one gets all the time left
+            plan = [(reply, depthLimit) for reply in successors] + ([(successors[0], maxDepth)] if successors else [])
+            completed = 0
+            try:
+                for reply, limit in plan:
+                    board.make_move(reply)
+                    self.ponderKeys.add(board.key)
+                    score = None
+                    for depth in range(1, limit + 1):
+                        begin = time.time()
+                        score = self.aspirationSearch(board, depth, turn, score, deadline)[0]
+                        stats.iterations.append((depth, time.time() - begin))
+                        completed = max(completed, depth)
+                        if score == math.inf or score == -math.inf:
+                            break
+                    board.unmake_move(reply)
+            except SearchTimeout:
+                pass
+
+            logger.info("ponder : %d replies, depth %d, %s", len(self.ponderKeys), completed, stats)
+
+    def stopPondering(self, state=None):
+        """
+            Stops the ponder and waits for it, called before searching the next position.\n
+            Returns True when the position was pondered : the search keeps the killers and the history as they are.
+        """
+        self.ponderId += 1
+        self.stopped = True
+        with self.pondering:
+            self.stopped = False
+        return state is not None and state.key in self.ponderKeys
+
+# partagé par tous les moteurs du processus, il reste rempli d'un coup à l'autre
+evaluationCache = EvaluationCache()
+
+# gardé pendant toute la partie par le serveur
+engine = Engine()
+
+def minimax(state, depth, maximizer, turn, alpha, beta):
+    return engine.minimax(state, depth, maximizer, turn, alpha, beta)
+
+def iterativeDeepening(state, turn, budget, maxDepth=30, pool=None):
+    return engine.iterativeDeepening(state, turn, budget, maxDepth, pool)
+
+# poids de l'heuristique, changés avec setWeights (tournament.py compare des réglages)
+POPULATION = 1
+CENTER = 2000
+WINNING = 30
+WIN = 200
+
+def setWeights(population=POPULATION, center=CENTER, winning=WINNING, win=WIN):
+    """
+        Changes the weights of heuristic for the whole process.
+    """
+    global POPULATION, CENTER, WINNING, WIN
+    POPULATION, CENTER, WINNING, WIN = population, center, winning, win
+    # les évaluations gardées ont été faites avec les anciens poids
+    evaluationCache.clear()
+
+def setCacheSize(megabytes):
+    """
+        Changes the memory cap of evaluationCache, the cache of the engines of the whole process.
+    """
+    evaluationCache.resize(megabytes)
+
+def heuristic(state, maximizer):
+    """
+        population + closeCenter + winning, and WIN for the winner.\n
+        Reads the running totals of the board, no marble is visited.
+    """
+    result = POPULATION * state.adjacency[maximizer]
+
+    out = 14 - state.count[not maximizer]
+    if out >= 6:
+        result += WIN
+    elif state.count[maximizer] <= 8:
+        result -= WIN
+
+    distance = state.centerDistance[maximizer] / DISTANCE_SCALE
+    result += CENTER / distance if distance > 0 else CENTER
+
+    result += WINNING * out
 
+    return result
 
+def evaluateMoves(state, successors, maximizer):
+    """
+        heuristic(child, maximizer) of the child after each move, all computed by evaluation.py when NumPy is there,
+        and whether each child ends the game.
+    """
+    if evaluation is not None and successors:
+        scores, finished = evaluation.evaluate(state, successors, maximizer, (POPULATION, CENTER, WINNING, WIN))
+        return scores.tolist(), finished.tolist()
+
+    scores = []
+    finished = []
+    for move in successors:
+        state.make_move(move)
+        scores.append(heuristic(state, maximizer))
+        finished.append(state.is_terminal())
+        state.unmake_move(move)
+    return scores, finished
+
+# position de départ de toutes les parties (la même que dans Code/game.py)
+STANDARD = [
+    ["W", "W", "W", "W", "W", "X", "X", "X", "X"],
+    ["W", "W", "W", "W", "W", "W", "X", "X", "X"],
+    ["E", "E", "W", "W", "W", "E", "E", "X", "X"],
+    ["E", "E", "E", "E", "E", "E", "E", "E", "X"],
+    ["E", "E", "E", "E", "E", "E", "E", "E", "E"],
+    ["X", "E", "E", "E", "E", "E", "E", "E", "E"],
+    ["X", "X", "E", "E", "B", "B", "B", "E", "E"],
+    ["X", "X", "X", "B", "B", "B", "B", "B", "B"],
+    ["X", "X", "X", "X", "B", "B", "B", "B", "B"]
+]
 
 class Board:
-    def __init__(self, board):
-        self.board = board
+    def __init__(self, white=0, black=0):
+        # indexed by maximizer : False -> black, True -> white
+        self.marbles = [black, white]
+        # Zobrist key, updated by every move
+        self.key = zobristKey(white, black)
+        # running totals of the heuristic, indexed like marbles and updated by every move,
+        # the summed distance to the center in DISTANCE_UNITS so that undoing a move restores it exactly
+        self.count, self.centerDistance, self.adjacency = self.computeTotals()
+
+    def computeTotals(self):
+        """
+            Computes from scratch the number of marbles, the summed distance to the center
+            and the number of neighbours of the same color (population) of each color.
+        """
+        count = [mask.bit_count() for mask in self.marbles]
+        centerDistance = [sum(DISTANCE_UNITS[cell] for cell in bits(mask)) for mask in self.marbles]
+        adjacency = [sum((mask & shift(mask, moveName)).bit_count() for moveName in moves) for mask in self.marbles]
+        return count, centerDistance, adjacency
+
+    @classmethod
+    def fromGrid(cls, grid):
+        """
+            Builds a board from the server's 9x9 grid of "W", "B", "E" and "X".
+        """
+        return cls(*gridMasks(grid))
+
+    @classmethod
+    def fromPosition(cls, position):
+        return cls(position.white, position.black)
+
+    def position(self, turn):
+        """
+            Immutable copy of the marbles, with the player to move.
+        """
+        return Position(self.marbles[True], self.marbles[False], turn)
+
+    def toGrid(self):
+        """
+            Converts the board back into the server's 9x9 grid.
+        """
+        grid = [["X"] * 9 for _ in range(9)]
+        for cell in CELLS:
+            grid[cell // 9][cell % 9] = "E"
+        for cell in bits(self.marbles[True]):
+            grid[cell // 9][cell % 9] = "W"
+        for cell in bits(self.marbles[False]):
+            grid[cell // 9][cell % 9] = "B"
+        return grid
+
+    def copy(self):
+        return Board(self.marbles[True], self.marbles[False])
 
     def myColor(self, maximizer):
         yourColor= ""
@@ -121,169 +825,122 @@ class Board:
             yourColor = "B"
 
         return yourColor
-    
-
-    def closeCenter(self, maximizer):
-        myColor = self.myColor(maximizer)       
-        marbles = set()
-        result = 0
-        for i,row in enumerate(self.board):         
-            for j,value in enumerate(row):
-                if value == myColor:
-                    marbles.add((i,j))
-        
-        for i in marbles:
-            result += self.distance(i)
-
-        return 1 / result * 2000
-
-    def distance(self, marble):
-        center = [4,4]
-        #sum = 0
-
-        # for marble in marbles:
-        #    rowDistance = abs(marble[0] - center[0])
-        #    colDistance = abs(marble[1] - center[1])
 
-        #    result = rowDistance + colDistance
-        #    sum += result
 
-        # return sum
- 
+    def closeCenter(self, maximizer):
+        result = self.centerDistance[maximizer] / DISTANCE_SCALE
 
-        #dist= sqrt[(x2-x1)^2 +(y2-y1)^2]
-        dist2 = math.sqrt((marble[0] - 4)**2 + (marble[1] - 4)**2)         
-        #dist = ((abs(marbles[0] - 4) + abs(marbles[1] - 4))/2)
+        if result == 0:
+            # the only marble left is on the center
+            return CENTER
+        return CENTER / result
 
-        return dist2
+    def distance(self, marble):
+        return CENTER_DISTANCE[marble[0] * 9 + marble[1]]
 
     def population(self, maximizer):
-        color = self.myColor(maximizer)
-        counter = 0
-
-        for i, row in enumerate(self.board):
-            for j, value in enumerate(row):
-                if value == color:
-                    for move in list(moves.values()):
-                        try:
-                            if self.board[i + move[0]][j + move[1]] == color:
-                                counter += 1
-                        except:
-                            # lorqu'on se trouve aux abords du plateau, on peut recevoir une erreur pour certains mouvements faits
-                            pass
-
-        return counter
+        """
+            Counts the neighbours of each marble having the same color.
+        """
+        return self.adjacency[maximizer]
 
     def winning(self, maximizer):
-        yourColor = self.myColor(maximizer)
-        compte = self.opposingMarblesOut(maximizer)
-        resultat = 0
-        for i in range(compte):
-            resultat += 30
-
-        return resultat
-
-    def centerEmpty(self, maximizer):
-        return False
-
-    def tricheBoard(self, maximizer):
-        color = self.myColor(maximizer)
-        fakeBoard = self.board
-        fakeBoard[4,4] = color
-        return fakeBoard
-
+        return WINNING * self.opposingMarblesOut(maximizer)
 
     def opposingMarblesOut(self, maximizer):
-        yourColor = self.myColor(maximizer)
-        counter = 0
-        opposingColor = ''
+        return 14 - self.count[not maximizer]
 
-        # ! COMMENT FAIRE CETTE CONDITION TERNAIRE ?
-        # opposingColor = 'W' if(yourColor == 'B') else opposingColor = 'B'
-
-        if yourColor == 'B':
-            opposingColor = 'W'
-        else:
-            opposingColor = 'B'
-
-        for row in self.board:                
-            for box in row:
-                if box == opposingColor:
-                    counter += 1
-
-        return 14 - counter
-
-    def legal_plays(self, maximizer):        
-        color = self.myColor(maximizer)
-        allMoves = []      
-        chosenBoxes = []
-        possibleChains = []
-        myMoves = list(moves.keys())
-        lengthChains = [1, 2, 3]               
-
-        for i,row in enumerate(self.board):
-            for j,value in enumerate(row):
-                if value == color:
-                    chosenBoxes.append([i,j])                          
-                
-        for i in lengthChains:
-            for j in chosenBoxes:
-                chains = self.possibleChainsFromPoint(i, j, None, None, [], [], possibleDirections=list(moves.values()))                     
-                if chains != "notMoveFoundError":
-                    for elem in chains:
-                        possibleChains.append(elem)                                  
-
-        for chain in possibleChains:               
-            for move in myMoves:                           
-                if self.action(chain, move, maximizer) is not False:                    
-                    allMoves.append((chain,move))
-        
-        # for move in allMoves:
-        #     print(move)
-      
-        return allMoves
+    def generateMoves(self, maximizer, quiet=True):
+        """
+            Yields every legal Move of the player in one pass over its marbles, only the pushes without quiet.\n
+            - Line moves : each marble is the tail of at most one chain per direction, made of the marbles
+              in front of it, the chain moves if the next box is empty or pushes a shorter opposing line\n
+            - Arrow moves : each marble starts at most one chain of 2 and one of 3 per axis, moved
+              sideways when all the boxes in front of it are empty
+        """
+        mine = self.marbles[maximizer]
+        opponent = self.marbles[not maximizer]
+        empty = FULL & ~(mine | opponent)
+
+        for cell in bits(mine):
+            tail = 1 << cell
+
+            for moveName, following in DIRECTIONS:
+                chain = tail
+                length = 1
+                box = following[cell]
+                while box >= 0 and mine >> box & 1 and length < 3:
+                    chain |= 1 << box
+                    length += 1
+                    box = following[box]
+
+                if box < 0:
+                    continue
+                head = 1 << box
+                if head & empty:
+                    if quiet:
+                        yield Move(maximizer, chain, moveName, tail | head, 0)
+                elif head & opponent:
+                    pushed = 1
+                    behind = following[box]
+                    while behind >= 0 and opponent >> behind & 1:
+                        pushed += 1
+                        behind = following[behind]
+                    if pushed >= length:
+                        continue
+                    if behind < 0:
+                        yield Move(maximizer, chain, moveName, tail | head, head)
+                    elif empty >> behind & 1:
+                        yield Move(maximizer, chain, moveName, tail | head, head | 1 << behind)
+
+            if not quiet:
+                # les moves de côté ne poussent jamais
+                continue
+            for axis, following, sides in BROADSIDES:
+                second = following[cell]
+                if second < 0 or not mine >> second & 1:
+                    continue
+                third = following[second]
+                hasThird = third >= 0 and mine >> third & 1
+                pair = tail | 1 << second
+
+                for moveName, side in sides:
+                    first = side[cell]
+                    if first < 0 or not empty >> first & 1:
+                        continue
+                    nextToSecond = side[second]
+                    if nextToSecond < 0 or not empty >> nextToSecond & 1:
+                        continue
+                    moved = 1 << first | 1 << nextToSecond
+                    yield Move(maximizer, pair, moveName, pair | moved, 0)
+
+                    if hasThird:
+                        nextToThird = side[third]
+                        if nextToThird >= 0 and empty >> nextToThird & 1:
+                            triple = pair | 1 << third
+                            yield Move(maximizer, triple, moveName, triple | moved | 1 << nextToThird, 0)
+
+    def legal_plays(self, maximizer):
+        return list(self.generateMoves(maximizer))
 
     def is_terminal(self):
-        scoreWhite = self.opposingMarblesOut(False)
-        scoreBlack = self.opposingMarblesOut(True)
-
-        if scoreBlack == 6 or scoreWhite == 6:
-            return True
-        
-        return False
+        return self.opposingMarblesOut(True) >= 6 or self.opposingMarblesOut(False) >= 6
 
     def winner(self, maximizer):
-            color = self.myColor(maximizer)
-            scoreWhite = self.opposingMarblesOut('B')
-            scoreBlack = self.opposingMarblesOut('W')
-        
-            if scoreBlack == 6 and color == "W":
-                return True
-            elif scoreBlack == 6 and color == "B":
-                return False
-            elif scoreWhite == 6 and color == "B":
-                return True
-            elif scoreWhite == 6 and color == "W":
-                return False
+        if self.opposingMarblesOut(maximizer) >= 6:
+            return True
+        elif self.opposingMarblesOut(not maximizer) >= 6:
+            return False
 
-            return None
+        return None
 
     def displayBoard(self):
         """
             Shows the Abalone board.
         """
         chainsult = "\n\t [ CURRENT BOARD ]\n\n"
-        for index,row in enumerate(self.board):
-            if index == 0 or index == 8:
-                chainsult += "        "
-            elif index == 1 or index == 7:
-                chainsult += "      "
-            elif index == 2 or index == 6:
-                chainsult += "    "
-            elif index == 3 or index == 5:
-                chainsult += "  "
-            elif index == 5:
-                chainsult += ""
+        for index,row in enumerate(self.toGrid()):
+            chainsult += "  " * abs(4 - index)
             for case in row:
                 if case == "X":
                     pass
@@ -292,452 +949,202 @@ class Board:
                 else:
                     chainsult += f" {case}  "
             chainsult += "\n"
-    
+
         print(chainsult)
 
-    def existingDirection(self, moveName):
+    def maskOf(self, marblesArray):
         """
-            Checks if the direction exists.
+            Converts a list of [i, j] into a mask, returns None if a box is out of the board or given twice.
         """
-        if moves.get(moveName) is None:
-            return False
-        return True
+        mask = 0
+        for marble in marblesArray:
+            if not onBoard(marble[0], marble[1]):
+                return None
+            bit = 1 << (marble[0] * 9 + marble[1])
+            if mask & bit:
+                return None
+            mask |= bit
+
+        return mask
 
-    def aligned(self, vector01, vector02):
+    def colored(self, mask, maximizer):
         """
-            Check if 2 vectors are aligned or not.
+            Checks if all marbles of the mask belong to the player.
         """
-        sum = [vector01[0] + vector02[0], vector01[1] + vector02[1]]
-        product = [2*i for i in vector01]
-        if product == sum or sum == [0, 0]:
-            return True
-    
-        return False
+        return mask != 0 and mask & ~self.marbles[maximizer] == 0
 
-    def colored(self, marblesArray, color):
+    def chain(self, mask):
         """
-        ! FIX BUGS WITH COLOR    
-            Checks if all marbles have the right color.
+            Checks if all marbles are aligned.\n
+            Returns the axis of the chain, None for a single marble, False if it is not a chain.
         """
-        for marble in marblesArray:
-            if self.board[marble[0]][marble[1]] != 'W' and self.board[marble[0]][marble[1]] != 'B':
-                # print("no marble here", marblesArray, marble, self.board[marble[0]][marble[1]])
+        if mask & (mask - 1) == 0:
+            return None
+
+        return LINES.get(mask, False)
+
+    def lineMove(self, mask, moveName, maximizer):
+        """
+            Moves the chain along its own axis (a single marble is always on the axis).\n
+            - Next box out of the board or occupied by an ally : error\n
+            - Next box empty : the chain moves\n
+            - Next box occupied by the opponent (sumito) : the opponent's line must be shorter than the chain
+              and followed by an empty box or by the edge, the last opposing marble is then pushed out\n
+            Returns the masks to xor on the player's marbles and on the opponent's marbles, or False.
+        """
+        mine = self.marbles[maximizer]
+        opponent = self.marbles[not maximizer]
+        moved = shift(mask, moveName)
+        head = moved & ~mask
+
+        if head == 0 or head & mine:
+            return False
+        if head & opponent == 0:
+            return mask ^ moved, 0
+
+        length = mask.bit_count()
+        pushed = 0
+        box = head
+        while box & opponent:
+            pushed |= box
+            if pushed.bit_count() >= length:
                 return False
-            else:
-                if self.board[marble[0]][marble[1]] != color:
-                    # print("wrong color marble")
-                    return False
-
-        return True
-
-    def chain(self, marblesArray, move=None):
-        """
-            Checks if all marbles are aligned.
-        """
-        if len(marblesArray) > 3:
-            return "lengthChainError"
-    
-        if len(marblesArray) == 1:
-            return move
-
-        marblesArray.sort()
-        if move is not None:
-            if marblesArray[0] == [marblesArray[1][0] + move[0], marblesArray[1][1] + move[1]]:
-                return self.chain(marblesArray[1:], move=move)
-
-        for currentMove in moves.values():
-            if marblesArray[0] == [marblesArray[1][0] + currentMove[0], marblesArray[1][1] + currentMove[1]]:
-                return self.chain(marblesArray[1:], move=currentMove)
-    
-        return "marblesChainError"
-
-    def lineMove(self, marblesArray, moveName, opponent=False):
-        """
-            - Checks the chain\n
-            - Checks lhe list (more than one marble ?)\n
-            - Checks the alignment between the move and the chain\n
-                - Finds the chain's last marble\n
-                - Tries to find the next color\n
-                    - Next color is out of range, returns an error\n
-                    - Next color == 'X' (out of limit), returns an error\n
-                    - Next color == actual color ('W' == 'W'), return an error\n
-                    - Next color == 'E' (empty), you can move your chain\n
-                    - Next color == opposing color, looks at the opponent chain and checks if the box behind the string is empty or out of board
-        """
-        vectorMove = moves[moveName]
-        vectorChain = self.chain(marblesArray)
-        lastMarble = marblesArray[0]
-
-        if vectorChain == "lengthChainError" or vectorChain == "marblesChainError":
-            return False, "chainError", marblesArray, moveName
-    
-        if vectorChain == None and opponent is False:
-            return "soloMarbleInfo", marblesArray, moveName
-
-        if (self.aligned(vectorMove, vectorChain)):
-            if vectorMove == [-1, -1]:
-                lastMarble =  min(marblesArray)
-            elif vectorMove == [1, 1]:
-                lastMarble = max(marblesArray)
-            elif vectorMove == [1, 0]:
-                for marble in marblesArray[1:]:
-                    if marble[0] > lastMarble[0]:
-                        lastMarble = marble
-            elif vectorMove == [-1, 0]:
-                for marble in marblesArray[1:]:
-                    if marble[0] < lastMarble[0]:
-                        lastMarble = marble
-            elif vectorMove == [0, 1]:
-                for marble in marblesArray[1:]:
-                    if marble[1] > lastMarble[1]:
-                        lastMarble = marble
-            elif vectorMove == [0, -1]:
-                for marble in marblesArray[1:]:
-                    if marble[1] < lastMarble[1]:
-                        lastMarble = marble
-    
-            if len(marblesArray) == 3 and (lastMarble[0] == 0 or lastMarble[1] == 0 or lastMarble[0] == 8 or lastMarble[1] == 8):
-                return False, "outOfLimitError", marblesArray, moveName
-
-            marblesArray.sort()
-            if len(marblesArray) == 2:
-                if (marblesArray[0][0] == 0 or marblesArray[0][1] == 0) and (moveName == "NE" or moveName == "NW"):
-                    return False, "outOfLimitError"
-                elif (marblesArray[-1][0] == 8 or marblesArray[-1][1] == 8) and (moveName == "SE" or moveName == "SW"):
-                    return False, "outOfLimitError"
-
-
-            currentValue = self.board[lastMarble[0]][lastMarble[1]]
-            try:
-                nextValue = self.board[lastMarble[0] + vectorMove[0]][lastMarble[1] + vectorMove[1]] 
-            except:
-                return False, "allyOutOfBoardError", marblesArray, moveName
-
-            if nextValue == 'X':
-                return False, "outLimitError", marblesArray, moveName
-            elif nextValue == currentValue:
-                return False, "sameValueError", marblesArray, moveName
-            elif nextValue == 'E':
-                marblesMoved = []
-                for marble in marblesArray:
-                    marblesMoved.append([marble[0] + vectorMove[0], marble[1] + vectorMove[1]])
-                return True, marblesArray, marblesMoved
-            else:
-                try: # ! test [CHECKED]
-                    coord = [lastMarble[0] + len(marblesArray) * vectorMove[0], lastMarble[1] + len(marblesArray) * vectorMove[1]]
-                    lastOpponentMarbleValue = self.board[coord[0]][coord[1]]
-                    # print("one : ", lastOpponentMarbleValue, coord)
-                except:
-                    try:
-                        # print("two : ", lastOpponentMarbleValue)
-                        lastOpponentMarbleValue = self.board[lastMarble[0] + (len(marblesArray) - 1) * vectorMove[0]][lastMarble[1] + (len(marblesArray) - 1) * vectorMove[1]]
-                    except:
-                        return False, "outOfRange"
-                    
-                if lastOpponentMarbleValue != 'E' or lastOpponentMarbleValue == 'X':
-                    return False, "NonEmptyError", marblesArray, moveName
-                else:
-                    marblesMoved = []
-                    opponentMarbles = []
-                    opponentMarblesMoved = []
-                
-                    for marble in marblesArray:
-                        marblesMoved.append([marble[0] + vectorMove[0], marble[1] + vectorMove[1]])
-
-                    for i in range(1, len(marblesArray)):
-                        opponentValue = self.board[lastMarble[0] + i * vectorMove[0]][lastMarble[1] + i * vectorMove[1]]
-                        color = self.board[lastMarble[0]][lastMarble[1]]
-
-                        if color == 'W':
-                            opponentColor = 'B'
-                        else:
-                            opponentColor = 'W'
-
-                        if(opponentValue != opponentColor):
-                            break
-                        opponentMarbles.append([lastMarble[0] + i * vectorMove[0], lastMarble[1] + i * vectorMove[1]])
+            box = shift(box, moveName)
 
-                        if self.board[opponentMarbles[-1][0] + vectorMove[0]][opponentMarbles[-1][1] + vectorMove[1]] != 'E':
-                            return False, None
+        if box & mine:
+            return False
 
-                    if len(opponentMarbles) == 1:
-                        self.soloMove(opponentMarbles, moveName, opponent=True)
-                    else:
-                        self.lineMove(opponentMarbles, moveName, opponent=True)
+        return mask ^ moved, pushed ^ shift(pushed, moveName)
+
+    def arrowMove(self, mask, moveName, maximizer):
+        """
+            Moves the chain sideways (broadside), every box in front of the chain must be empty and on the board.\n
+            Returns the masks to xor on the player's marbles and on the opponent's marbles, or False.
+        """
+        moved = shift(mask, moveName)
+
+        if moved.bit_count() != mask.bit_count():
+            return False
+        if moved & (self.marbles[True] | self.marbles[False]):
+            return False
 
-                    return True, marblesArray, marblesMoved, opponentMarbles, opponentMarblesMoved
-                
-        return False, "nonAlignedError", marblesArray, moveName
+        return mask ^ moved, 0
 
-    def arrowMove(self, marblesArray, moveName, opponent=False):
+    def tryMove(self, mask, moveName, maximizer):
         """
-            - Checks the list only one marble ?)\n
-            - Iterates the list\n
-                - Next box == actual color ('B' == 'B'), returns error\n
-                - Next box  == 'X' (out of limit), returns error\n
-                - Next box == 'E' (empty), you can move your marble there\n
-                - Next box == opposing color, checks if there is an empty box behind its position\n
-            \n
-            For each marbles, if the next box is 'E' or the opposing color (with an empty box behind), you can move your chain !
+            Checks the chain and the direction, then tries the line move or the arrow move.\n
+            Returns the Move, or False.
         """
-        updatedMarbles = []
-        if len(marblesArray) == 1:
-            return "singleMarbleInfo", marblesArray, moveName
+        axis = self.chain(mask)
 
-        for marble in marblesArray:
-            if ((moveName.__contains__('S') and marble[0] != 8) or (moveName.__contains__('N') and marble[0] != 0)) and ((moveName.__contains__('W') and marble[1] != 0) or (moveName.__contains__('E') and marble[1] != 8)): 
-                nextMarbleValue = self.board[marble[0] + moves[moveName][0]][marble[1] + moves[moveName][1]]
-                currentMarbleValue = self.board[marble[0]][marble[1]]
-                # print(currentMarbleValue, nextMarbleValue)
-                if nextMarbleValue == currentMarbleValue:
-                    return False, "allyPchainsenceError", marblesArray, moveName
-                elif nextMarbleValue == 'X':
-                    return False, "outLimitError", marblesArray, moveName
-                elif nextMarbleValue == 'E':
-                    pass
-                else:
-                    try:
-                        tempValue = [marble[0] + moves[moveName][0], marble[1] + moves[moveName][1]]
-                        print(tempValue)
-                        if self.board[tempValue[0]][tempValue[1]] == nextMarbleValue:
-                            return False, "opponentMoveError", marblesArray, moveName
-                    except:
-                        return False, "outOfRange"
-
-                updatedMarbles.append([marble[0] + moves[moveName][0], marble[1] + moves[moveName][1]])
-    
-        if len(updatedMarbles) != 0:
-            return True, marblesArray, updatedMarbles
-    
-        return False, "notAnArrowMoveError"
-
-    def soloMove(self, marblesArray, moveName, opponent=False):
-        """
-            - Checks the # of marbles in list\n
-            - Checks the next box\n
-                - Next box == 'X' (out of limit), returns an error\n
-                - Next box == actual color ('W' == 'W'), returns an error\n
-                - Next box == 'E' (empty), you can move your marble there\n
-                - Next box == opposing color, returns an error (you have to move at least 2 allies to push your opponent)\n
-            \n
-            So if the next box is 'E', you can move your marble and update your board !
-        """
-        if len(marblesArray) == 1:
-            currentValue = self.board[marblesArray[0][0]][marblesArray[0][1]]
-            try:
-                nextValue = self.board[marblesArray[0][0] + moves[moveName][0]][marblesArray[0][1] + moves[moveName][1]]
-            except:
-                nextValue = self.board[marblesArray[0][0]][marblesArray[0][1]]
-
-            if nextValue == 'X':
-                return False, "outLimitError"
-            elif nextValue == currentValue:
-                return False, "allyPchainsenceError"
-            elif nextValue == 'E':
-                pass
-            else:
-                return False, "opponentMoveError"
+        if axis is False:
+            return False
+        if axis is None or axis == AXIS[moveName]:
+            deltas = self.lineMove(mask, moveName, maximizer)
+        else:
+            deltas = self.arrowMove(mask, moveName, maximizer)
 
-            marbleMoved = [[marblesArray[0][0] + moves[moveName][0], marblesArray[0][1] + moves[moveName][1]]]
-            return True, marblesArray, marbleMoved
-    
-        return False, "notAsingleMarbleError"
+        if deltas is False:
+            return False
+
+        return Move(maximizer, mask, moveName, *deltas)
 
-    def updateBoard(self, oldPositions, newPositions):
+    def updateBoard(self, maximizer, mineDelta, opponentDelta):
         """
             Adds changes into the last board.
         """
-        color = self.board[oldPositions[0][0]][oldPositions[0][1]]
+        self.updateColor(maximizer, mineDelta)
+        self.updateColor(not maximizer, opponentDelta)
+        self.key ^= deltaKey(maximizer, mineDelta) ^ deltaKey(not maximizer, opponentDelta)
 
-        for marble in oldPositions:
-            self.board[marble[0]][marble[1]] = 'E'
-    
-        for marble in newPositions:
-            self.board[marble[0]][marble[1]] = f"{color}"
+    def updateColor(self, maximizer, delta):
+        """
+            Xors the delta on the marbles of one color and updates its totals with the changed boxes only.
+        """
+        if delta == 0:
+            return
+
+        mask = self.marbles[maximizer]
+        removed = delta & mask
+        added = delta & ~mask
+        distance = self.centerDistance[maximizer]
+        adjacency = self.adjacency[maximizer]
+
+        # each pair of neighbours is counted twice, once from each marble
+        for cell in bits(removed):
+            mask ^= 1 << cell
+            distance -= DISTANCE_UNITS[cell]
+            adjacency -= 2 * (NEIGHBOUR_MASKS[cell] & mask).bit_count()
+        for cell in bits(added):
+            adjacency += 2 * (NEIGHBOUR_MASKS[cell] & mask).bit_count()
+            distance += DISTANCE_UNITS[cell]
+            mask |= 1 << cell
+
+        self.marbles[maximizer] = mask
+        self.count[maximizer] += added.bit_count() - removed.bit_count()
+        self.centerDistance[maximizer] = distance
+        self.adjacency[maximizer] = adjacency
+
+    def make_move(self, move):
+        """
+            Plays a Move of legal_plays.\n
+            Returns the undo record for unmake_move, the move itself.
+        """
+        self.updateBoard(move.maximizer, move.mineDelta, move.opponentDelta)
+
+        return move
+
+    def unmake_move(self, undo):
+        """
+            Restores the board as it was before make_move, pushed out marbles included.\n
+            The deltas are xor masks so playing them a second time undoes them.
+        """
+        self.updateBoard(undo.maximizer, undo.mineDelta, undo.opponentDelta)
 
     def action(self, marblesArray, moveName, maximizer, update=False):
         """
             - Checks the marble's color\n
             - Checks the direction existence\n
             - Checks the marbles alignment\n
-            \t- Tries making a lineMove\n
-            \t- If lineMove returns an error, tries making an arrowMove\n
-            \t- If arrowMove returns an error, tries making a soloMove\n
-            - If lineMove, arrowMove and soloMove return errors, the program returns False
+            \t- Tries making a lineMove along the chain\n
+            \t- Tries making an arrowMove across the chain\n
+            - If the move is not possible, the program returns False
         """
-        color = self.myColor(maximizer)
+        if moves.get(moveName) is None:
+            return False
 
-        if self.colored(marblesArray, color) is not True:
-            # print(f"color error : '{color}'")
+        mask = self.maskOf(marblesArray)
+        if mask is None or not self.colored(mask, maximizer):
             return False
 
-        if self.existingDirection(moveName) is False:
-            # print(f"direction error : '{moveName}'")
+        move = self.tryMove(mask, moveName, maximizer)
+        if move is False:
             return False
 
-        if self.chain(marblesArray) != "lengthChainError" and self.chain(marblesArray) != "marblesChainError":
-        
-            lm = self.lineMove(marblesArray, moveName)
-            am = self.arrowMove(marblesArray, moveName)
-            sm = self.soloMove(marblesArray, moveName)
-            if lm[0] is not True:
-                if am[0] is not True:
-                    if sm[0] is not True:
-                        # print(f"lineMove  : {lm}")
-                        # print(f"arrowMove : {am}")
-                        # print(f"soloMove  : {sm}")
-                        return False
-                    else:
-                        # print("solo move")
-                        self.updateBoard(sm[1], sm[2]) if update == True else None
-                else:
-                    # print("arrow move")
-                    self.updateBoard(am[1], am[2]) if update == True else None
-            else:
-                # print("line move")
-                self.updateBoard(lm[3], lm[4]) if (len(lm) == 4) and update == True else None
-                self.updateBoard(lm[1], lm[2]) if update == True else None
-    
-            return moveName
-    
-        return False
-
-    def possibleChainsFromPoint(self, lengthChain, referenceMarble, currentMarble=None, move=None, chain=[], chainsList=[], possibleDirections=list(moves.values())):    
-        if currentMarble is None:
-            currentMarble = referenceMarble
-    
-        if len(chain) == 0:
-            chain.append(currentMarble)
-    
-        chain.sort()
-
-        if lengthChain == 1:
-            chainsList.append(chain)
-            return chainsList
-        elif lengthChain == len(chain):
-            chainsList.append(chain)
-            possibleDirections.remove(move)
-            return self.possibleChainsFromPoint(lengthChain, referenceMarble, None, None, [], chainsList, possibleDirections)
-
-        color = self.board[referenceMarble[0]][referenceMarble[1]]
-
-        if move is None:
-            for myMove in possibleDirections:
-                nextMarble = [currentMarble[0] + myMove[0], currentMarble[1] + myMove[1]]
-                previousMarble = [currentMarble[0] - myMove[0], currentMarble[1] - myMove[1]]
-            
-                if ((previousMarble[0] != -1 and previousMarble[0] != 9) and (previousMarble[1] != -1 and previousMarble[1] != 9)) and ((nextMarble[0] != -1 and nextMarble[0] != 9) and (nextMarble[1] != -1 and nextMarble[1] != 9)):
-                    nextMarbleColor = self.board[nextMarble[0]][nextMarble[1]]
-                    previousMarbleColor = self.board[previousMarble[0]][previousMarble[1]]
-                    if previousMarbleColor == color and nextMarbleColor == color:
-                        doubleNeighbourChain = [previousMarble, currentMarble, nextMarble]
-                        doubleNeighbourChain.sort()
-                        if chainsList.__contains__(doubleNeighbourChain) is not True and lengthChain == 3:
-                            chainsList.append(doubleNeighbourChain)
-                            return self.possibleChainsFromPoint(lengthChain, referenceMarble, None, myMove, [], chainsList, possibleDirections)
-                        return self.possibleChainsFromPoint(lengthChain, referenceMarble, None, myMove, chain, chainsList, possibleDirections)
-
-                if nextMarble[0] != -1 and nextMarble[0] != 9 and nextMarble[1] != -1 and nextMarble[1] != 9:
-                    nextMarbleColor = self.board[nextMarble[0]][nextMarble[1]]  
-                    if nextMarbleColor == color:
-                        return self.possibleChainsFromPoint(lengthChain, referenceMarble, currentMarble, myMove, chain, chainsList, possibleDirections)
-                else:
-                    possibleDirections.remove(myMove)
-                    return self.possibleChainsFromPoint(lengthChain, referenceMarble, None, None, [], chainsList, possibleDirections)
-            if len(chainsList) > 0:
-                chainsList.sort()
-                return chainsList
+        if update == True:
+            self.make_move(move)
 
-            return "notMoveFoundError"
-        else:
-            nextMarble = [currentMarble[0] + move[0], currentMarble[1] + move[1]]
-            if (nextMarble[0] != -1 and nextMarble[0] != 9) and (nextMarble[1] != -1 and nextMarble[1] != 9):
-                nextMarbleColor = self.board[nextMarble[0]][nextMarble[1]]
-
-                if nextMarbleColor == color:
-                    chain.append(nextMarble)
-                    return self.possibleChainsFromPoint(lengthChain, referenceMarble, nextMarble, move, chain, chainsList, possibleDirections)
-            
-            previousMarble = [referenceMarble[0] - move[0], referenceMarble[1] - move[1]]
-            if (previousMarble[0] != -1 and previousMarble[0] != 9) and (previousMarble[1] != -1 and previousMarble[1] != 9):
-                previousMarbleColor = self.board[previousMarble[0]][previousMarble[1]]
-
-                if previousMarbleColor == color:
-                    chain.append(previousMarble)
-                    chain.sort()
-                    if chainsList.__contains__(chain) is not True and len(chain) == lengthChain:
-                        chainsList.append(chain)
-                        return self.possibleChainsFromPoint(lengthChain, referenceMarble, previousMarble, move, [], chainsList, possibleDirections)
-
-            possibleDirections.remove(move)
-            return self.possibleChainsFromPoint(lengthChain, referenceMarble, None, None, [], chainsList, possibleDirections)
-
-    def randomPlay(self, color):
-        """
-            Choose one random chain with one random move in the board.\n
+        return moveName
+
+    def randomPlay(self, maximizer):
+        """
+            Chooses one random chain with one random move in the board and plays it.\n
             The method returns :
                 - the color
-                - the length of the chain
-                - the marble
-                - the chain built from this marble
+                - the chain
                 - the move
         """
-        randomLength = random.choice((1,2,3))
-        chosenBoxes = []
-        myMoves = list(moves.keys())
-
-        for i,row in enumerate(self.board):
-            for j,value in enumerate(row):
-                if value == color:
-                    chosenBoxes.append([i,j])
-    
-        randomMarble = random.choice(chosenBoxes)
-        chains = self.possibleChainsFromPoint(randomLength, randomMarble, None, None, [], [], list(moves.values()))
-        randomMove = random.choice(myMoves)
-    
-        possibleChains = self.possibleChainsFromPoint(randomLength, randomMarble, None, None, [], [], list(moves.values()))
-    
-        while possibleChains == "notMoveFoundError":
-            if len(chosenBoxes) > 1:
-                chosenBoxes.remove(randomMarble)
-                randomMarble = random.choice(chosenBoxes)
-                possibleChains = self.possibleChainsFromPoint(randomLength, randomMarble, None, None, [], [], list(moves.values()))
-            else:
-                # print("no marbles")
-                return False
-    
-        randomChain = random.choice(possibleChains)
-        a = self.action(randomChain, randomMove, color, False)
-
-        while a is False:
-            if myMoves != []:
-                randomMove = random.choice(myMoves)
-                myMoves.remove(randomMove)
-            else:
-                if len(chosenBoxes) > 1:
-                    chosenBoxes.remove(randomMarble)
-                    randomMarble = random.choice(chosenBoxes)
-                    possibleChains = self.possibleChainsFromPoint(randomLength, randomMarble, None, None, [], [], list(moves.values()))
-                    while possibleChains == "notMoveFoundError":
-                        if len(chosenBoxes) > 1:
-                            chosenBoxes.remove(randomMarble)
-                            randomMarble = random.choice(chosenBoxes)
-                            possibleChains = self.possibleChainsFromPoint(randomLength, randomMarble, None, None, [], [], list(moves.values()))
-                        else:
-                            return False
-                    randomChain = random.choice(possibleChains)
-                elif len(chosenBoxes) == 1:
-                    possibleChain =  self.possibleChainsFromPoint(randomLength, chosenBoxes[0], None, None, [], [], list(moves.values()))
-                    chosenBoxes.remove(randomMarble)
-                else:
-                    return False
-            a = self.action(randomChain, randomMove, color, True)
-    
-        return color, randomChain, a
-        
+        legal = self.legal_plays(maximizer)
+        if not legal:
+            return False
+
+        move = random.choice(legal)
+        self.make_move(move)
+
+        return self.myColor(maximizer), move.chain(), move.direction
 
 if __name__ == '__main__':
-    # state = Board([
+    # state = Board.fromGrid([
     # ["W", "W", "W", "W", "W", "X", "X", "X", "X"],
     # ["W", "W", "W", "W", "W", "W", "X", "X", "X"],
     # ["E", "E", "W", "W", "W", "E", "E", "X", "X"],
@@ -747,12 +1154,12 @@ if __name__ == '__main__':
     # ["X", "X", "E", "E", "B", "B", "B", "E", "E"],
     # ["X", "X", "X", "B", "B", "B", "B", "B", "B"],
     # ["X", "X", "X", "X", "B", "B", "B", "B", "B"]])
-    
+
     # state.displayBoard()
     # a,b= (minimax(state,3,True))   
     # print(a,b)
 
-    # b = Board([
+    # b = Board.fromGrid([
     # ["W", "W", "W", "W", "W", "X", "X", "X", "X"],
     # ["W", "W", "W", "W", "W", "W", "X", "X", "X"],
     # ["E", "E", "W", "W", "W", "E", "E", "X", "X"],
@@ -763,7 +1170,7 @@ if __name__ == '__main__':
     # ["X", "X", "X", "B", "B", "B", "B", "B", "B"],
     # ["X", "X", "X", "X", "B", "B", "B", "B", "B"]])
 
-    b = Board([
+    b = Board.fromGrid([
     ["E", "E", "E", "E", "E", "X", "X", "X", "X"],
     ["E", "E", "E", "E", "W", "E", "X", "X", "X"],
     ["E", "E", "W", "W", "W", "W", "E", "X", "X"],
@@ -774,7 +1181,7 @@ if __name__ == '__main__':
     ["X", "X", "X", "E", "B", "E", "E", "B", "E"],
     ["X", "X", "X", "X", "E", "E", "E", "E", "E"]])
 
-    # b = Board([
+    # b = Board.fromGrid([
     # ["W", "W", "E", "E", "B", "X", "X", "X", "X"],
     # ["W", "W", "W", "E", "E", "E", "X", "X", "X"],
     # ["E", "E", "W", "E", "W", "E", "E", "X", "X"],
@@ -804,6 +1211,6 @@ if __name__ == '__main__':
 
     # b.displayBoard()
     # b.action()
-    
+
 
     # print(id(a), id(b), id(c))
\ No newline at end of file
@@ -0,0 +1,215 @@
+import math
+import time
+import random
+import logging
+
+import Abalone_V2 as av
+
+try:
+    import rollouts
+except ImportError:
+    # sans numpy, seulement les rollouts un par un
+    rollouts = None
+
+"""
+    Monte-Carlo Tree Search (UCB1) on the bitboard Board, the working version of Trash/MonteCarloTreeSearch.py.
+
+    The nodes live in an arena : one list per field, a node is its index in the lists. The children of a
+    node are created together when it is expanded, they are the indexes firstChild to firstChild + childCount.
+    A node is reached again by its Position, which lets the tree of the previous move be reused.
+"""
+
+logger = logging.getLogger("abalone")
+
+class MonteCarloTreeSearch:
+    def __init__(self, board, current, **kwargs):
+        self.board = board
+        self.current = current # joueur qui doit jouer : True pour les blancs, False pour les noirs
+
+        self.C = kwargs.get('C', 1.4) # notre variable d'exploration, au plus grand au plus on explore
+        self.max_moves = kwargs.get('max_moves', 200) # le max de moves qu'on laisse la machine simuler
+        # rollouts arrêtés après ce nombre de moves et évalués avec l'heuristique, None pour jouer jusqu'à max_moves
+        self.cutoff = kwargs.get('cutoff', 20)
+        # écart d'heuristique qui donne 73% de chances de gagner à la coupure
+        self.scale = kwargs.get('scale', 100)
+        self.max_nodes = kwargs.get('max_nodes', 1 << 20)
+        # nombre de parties jouées ensemble par rollouts.playouts à chaque feuille, 0 pour un seul rollout
+        self.batch = kwargs.get('batch', 0)
+        if self.batch and rollouts is None:
+            raise ImportError("batched rollouts need numpy")
+        # les enfants d'un noeud développé sont rangés par leur évaluation, calculée pour tous en un appel
+        self.order = kwargs.get('order', True)
+        self.calculation_time = kwargs.get('time', 10) # cb de temps on simule (en secondes)
+        self.random = random.Random(kwargs.get('seed'))
+
+        self.clear()
+
+    def clear(self):
+        """
+            Empties the arena, the root is the current board.
+        """
+        self.parent = []
+        self.move = []
+        self.turn = [] # player to move at the node
+        self.firstChild = []
+        self.childCount = [] # -1 until the node is expanded
+        self.plays = []
+        self.wins = [] # wins of the player who played the move of the node
+        self.states = {}
+        self.root = self.newNode(-1, None, self.current)
+        self.states[self.board.position(self.current)] = self.root
+
+    def newNode(self, parent, move, turn):
+        self.parent.append(parent)
+        self.move.append(move)
+        self.turn.append(turn)
+        self.firstChild.append(-1)
+        self.childCount.append(-1)
+        self.plays.append(0)
+        self.wins.append(0.0)
+        return len(self.parent) - 1
+
+    def update(self, board, current):
+        """
+            Moves the root to the new position.\n
+            The tree is kept when the position was expanded by the previous searches (our move and the opponent's reply).
+        """
+        self.board = board
+        self.current = current
+        node = self.states.get(board.position(current))
+        if node is None:
+            self.clear()
+        else:
+            self.root = node
+
+    def expand(self, node, board):
+        """
+            Creates the children of the node, the first unvisited child is the one simulated next.\n
+            With order, the best evaluated moves for the player come first, in random order among equal scores ;
+            without, in random order.
+        """
+        turn = self.turn[node]
+        successors = board.legal_plays(turn)
+        self.random.shuffle(successors)
+        if self.order and successors:
+            scores = av.evaluateMoves(board, successors, turn)[0]
+            ranking = sorted(range(len(successors)), key=lambda index: scores[index], reverse=True)
+            successors = [successors[index] for index in ranking]
+        self.firstChild[node] = len(self.parent)
+        self.childCount[node] = len(successors)
+        for successor in successors:
+            self.newNode(node, successor, not turn)
+
+    def select(self, node):
+        """
+            Child of the node with the best UCB1, an unvisited child first.
+        """
+        plays = self.plays
+        wins = self.wins
+        first = self.firstChild[node]
+        logTotal = math.log(plays[node]) if plays[node] > 0 else 0
+        best = first
+        bestValue = -math.inf
+        for child in range(first, first + self.childCount[node]):
+            if plays[child] == 0:
+                return child
+            value = wins[child] / plays[child] + self.C * math.sqrt(logTotal / plays[child])
+            if value > bestValue:
+                bestValue = value
+                best = child
+        return best
+
+    def rollout(self, board, turn):
+        """
+            Plays random moves from the board and returns the result for the white player,
+            1 for a win, 0 for a loss, the evaluation of the position when the rollout is cut.\n
+            With batch, the result is the mean of a batch of playouts.
+        """
+        length = self.cutoff if self.cutoff is not None else self.max_moves
+        if self.batch:
+            # les parties pas finies à la coupure sont évaluées comme un rollout seul, avec scale
+            return rollouts.playouts(board, turn, self.batch, length, self.random.getrandbits(32), scale=self.scale).score
+
+        for _ in range(length):
+            if board.is_terminal():
+                return 1.0 if board.winner(True) else 0.0
+            successors = board.legal_plays(turn)
+            if not successors:
+                return 0.0 if turn else 1.0
+            board.make_move(self.random.choice(successors))
+            turn = not turn
+
+        if board.is_terminal():
+            return 1.0 if board.winner(True) else 0.0
+        if self.cutoff is None:
+            return 0.5
+        difference = av.heuristic(board, True) - av.heuristic(board, False)
+        return 1 / (1 + math.exp(-difference / self.scale))
+
+    def run_simulation(self):
+        board = self.board.copy()
+        node = self.root
+
+        # sélection : on descend avec UCB1 tant que les noeuds sont développés
+        while self.childCount[node] > 0:
+            node = self.select(node)
+            board.make_move(self.move[node])
+
+        # développement : un noeud déjà simulé reçoit ses enfants, on simule le premier
+        if self.childCount[node] == -1 and not board.is_terminal() and (node == self.root or self.plays[node] > 0) \
+                and len(self.parent) < self.max_nodes:
+            self.expand(node, board)
+            if self.childCount[node] > 0:
+                node = self.select(node)
+                board.make_move(self.move[node])
+
+        if self.plays[node] == 0:
+            # noeud atteint pour la première fois, il pourra devenir la racine si ses moves sont joués
+            self.states[board.position(self.turn[node])] = node
+
+        result = self.rollout(board, self.turn[node])
+
+        # on soigne les stats enfin, chaque noeud compte les victoires du joueur qui y a mené
+        # (jusqu'à la racine : les noeuds au-dessus sont ceux des coups déjà joués)
+        while True:
+            self.plays[node] += 1
+            self.wins[node] += result if not self.turn[node] else 1 - result
+            if node == self.root:
+                break
+            node = self.parent[node]
+
+    def get_play(self):
+        """
+            Simulates until the time budget is spent, at least once, and returns the most played move,
+            False when there is no move.
+        """
+        legal = self.board.legal_plays(self.current)
+        if not legal:
+            return False
+        if len(legal) == 1:
+            return legal[0]
+
+        games = 0
+        begin = time.time()
+        while True:
+            self.run_simulation()
+            games += 1
+            if time.time() - begin >= self.calculation_time:
+                break
+
+        root = self.root
+        if self.childCount[root] <= 0:
+            # arbre plein : la nouvelle racine n'a pas pu être développée
+            return self.random.choice(legal)
+        first = self.firstChild[root]
+        children = range(first, first + self.childCount[root])
+        best = max(children, key=lambda child: self.plays[child])
+        logger.info("mcts : %d simulations, %d nodes, %.1f%% for the move played (%d plays)",
+                    games, len(self.parent), 100 * self.wins[best] / max(self.plays[best], 1), self.plays[best])
+        return self.move[best]
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    board = av.Board.fromGrid(av.STANDARD)
+    mcts = MonteCarloTreeSearch(board, False, time=5)
+    print(mcts.get_play())
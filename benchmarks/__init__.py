@@ -0,0 +1,12 @@
+"""
+    Benchmarks of move generation, evaluation and search on a fixed corpus of positions.
+
+    python -m benchmarks [perftDepth] [searchDepth] [output] [baseline]
+
+    The results are written as JSON and compared with the stored baseline (benchmarks/baseline.json) :
+    the perft counts, also checked against the reference of perft.py, and the node counts of the search
+    are a correctness oracle for any rewrite,
+    the speeds are reported when they are worse than the baseline.
+"""
+from benchmarks.corpus import CORPUS, positions
+from benchmarks.suite import perft, run, compare
@@ -0,0 +1,37 @@
+import os
+import sys
+import json
+
+from benchmarks.suite import run, compare
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+if __name__ == '__main__':
+    # python -m benchmarks [perftDepth] [searchDepth] [output] [baseline]
+    # pour remplacer la baseline : python -m benchmarks 3 3 benchmarks/baseline.json
+    perftDepth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    searchDepth = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    output = sys.argv[3] if len(sys.argv) > 3 else "benchmark.json"
+    baselinePath = sys.argv[4] if len(sys.argv) > 4 else BASELINE
+
+    report = run(perftDepth, searchDepth)
+    for name, result in report["positions"].items():
+        print(f"{name:16} perft {result['perft']}  {result['legalPlaysPerSecond']} legal_plays/s  "
+              f"{result['actionsPerSecond']} actions/s  {result['evaluationsPerSecond']} evaluations/s  "
+              f"depth {searchDepth} : {result['search']['nodes']} nodes, {result['search']['nps']} nps  "
+              f"peak {result['peakMemory'] // 1024} KiB")
+    print(report["totals"])
+
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    baseline = None
+    if os.path.abspath(output) != os.path.abspath(baselinePath) and os.path.exists(baselinePath):
+        with open(baselinePath) as file:
+            baseline = json.load(file)
+    mismatches, regressions = compare(report, baseline)
+    for line in regressions:
+        print("slower :", line)
+    for line in mismatches:
+        print("MISMATCH :", line)
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,47 @@
+import Abalone_V2 as av
+
+"""
+    Fixed positions of the benchmarks : the standard layout, the position of Abalone_V2's __main__
+    and the one commented out next to it, each with both players to move.
+"""
+
+MIDDLE = [
+    ["E", "E", "E", "E", "E", "X", "X", "X", "X"],
+    ["E", "E", "E", "E", "W", "E", "X", "X", "X"],
+    ["E", "E", "W", "W", "W", "W", "E", "X", "X"],
+    ["E", "W", "B", "W", "W", "W", "B", "B", "X"],
+    ["E", "E", "B", "B", "W", "W", "B", "B", "W"],
+    ["X", "E", "B", "B", "W", "W", "E", "E", "E"],
+    ["X", "X", "E", "E", "E", "B", "B", "B", "E"],
+    ["X", "X", "X", "E", "B", "E", "E", "B", "E"],
+    ["X", "X", "X", "X", "E", "E", "E", "E", "E"]
+]
+
+OPENING = [
+    ["W", "W", "E", "E", "B", "X", "X", "X", "X"],
+    ["W", "W", "W", "E", "E", "E", "X", "X", "X"],
+    ["E", "E", "W", "E", "W", "E", "E", "X", "X"],
+    ["E", "E", "E", "E", "W", "E", "E", "E", "X"],
+    ["E", "B", "W", "E", "W", "W", "E", "E", "E"],
+    ["X", "E", "B", "W", "E", "E", "E", "E", "E"],
+    ["X", "X", "E", "W", "E", "B", "B", "E", "E"],
+    ["X", "X", "X", "B", "E", "B", "B", "B", "B"],
+    ["X", "X", "X", "X", "E", "B", "B", "B", "B"]
+]
+
+# name -> (grid, player to move), True for white
+CORPUS = {
+    "standard-black": (av.STANDARD, False),
+    "standard-white": (av.STANDARD, True),
+    "middle-black": (MIDDLE, False),
+    "middle-white": (MIDDLE, True),
+    "opening-black": (OPENING, False),
+    "opening-white": (OPENING, True),
+}
+
+def positions():
+    """
+        Yields the name, a new Board and the player to move of every position of the corpus.
+    """
+    for name, (grid, turn) in CORPUS.items():
+        yield name, av.Board.fromGrid(grid), turn
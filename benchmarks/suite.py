@@ -0,0 +1,142 @@
+import math
+import time
+import platform
+import tracemalloc
+
+import Abalone_V2 as av
+from transposition import EvaluationCache
+from perft import perft, referencePerft
+from benchmarks.corpus import positions
+
+"""
+    Measures of one run of the benchmarks, as a dict ready for JSON.
+
+    Counts (perft, nodes of the fixed-depth search) are exact and must match the baseline,
+    rates depend on the machine and are only compared with a tolerance.
+"""
+
+# durée minimale de chaque mesure de vitesse
+MINIMUM_TIME = 0.5
+
+# la référence de perft.py est lente, elle n'est comparée que jusqu'à cette profondeur
+REFERENCE_DEPTH = 2
+
+def rate(function, calls=1):
+    """
+        Calls per second of function, itself doing calls calls, repeated during at least MINIMUM_TIME.
+    """
+    repeats = 0
+    begin = time.perf_counter()
+    while True:
+        function()
+        repeats += 1
+        elapsed = time.perf_counter() - begin
+        if elapsed >= MINIMUM_TIME:
+            return repeats * calls / elapsed
+
+def benchPosition(board, turn, perftDepth, searchDepth):
+    result = {}
+
+    begin = time.perf_counter()
+    result["perft"] = [perft(board, turn, depth) for depth in range(1, perftDepth + 1)]
+    result["perftSeconds"] = round(time.perf_counter() - begin, 3)
+    color = "W" if turn else "B"
+    result["referencePerft"] = [referencePerft(board.toGrid(), color, depth) for depth in range(1, min(perftDepth, REFERENCE_DEPTH) + 1)]
+
+    successors = board.legal_plays(turn)
+    result["legalPlaysPerSecond"] = round(rate(lambda: board.legal_plays(turn)))
+
+    arguments = [(move.chain(), move.direction) for move in successors]
+    def actions():
+        for marbles, direction in arguments:
+            board.action(marbles, direction, turn)
+    result["actionsPerSecond"] = round(rate(actions, len(arguments)))
+
+    result["evaluationsPerSecond"] = round(rate(lambda: av.heuristic(board, turn)))
+
+    # un cache neuf et l'évaluation par lots fixée : les nœuds ne dépendent ni des recherches d'avant ni de NumPy
+    engine = av.Engine(cache=EvaluationCache(), batch=False)
+    begin = time.perf_counter()
+    score, move = engine.minimax(board, searchDepth, True, turn, -math.inf, math.inf)
+    elapsed = time.perf_counter() - begin
+    nodes = engine.stats.totalNodes()
+    result["search"] = {
+        "depth": searchDepth,
+        "nodes": nodes,
+        "score": score,
+        "seconds": round(elapsed, 3),
+        "nps": round(nodes / elapsed),
+    }
+
+    # tracemalloc ralentit tout : la mémoire est mesurée sur une deuxième recherche, pas chronométrée
+    tracemalloc.start()
+    av.Engine(cache=EvaluationCache(), batch=False).minimax(board, searchDepth, True, turn, -math.inf, math.inf)
+    result["peakMemory"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result
+
+def run(perftDepth=3, searchDepth=3):
+    """
+        Runs every measure on every position of the corpus.
+    """
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "perftDepth": perftDepth,
+        "searchDepth": searchDepth,
+        "positions": {},
+    }
+    for name, board, turn in positions():
+        report["positions"][name] = benchPosition(board, turn, perftDepth, searchDepth)
+
+    results = report["positions"].values()
+    nodes = sum(result["search"]["nodes"] for result in results)
+    seconds = sum(result["search"]["seconds"] for result in results)
+    report["totals"] = {
+        "perftLeaves": sum(result["perft"][-1] for result in results),
+        "searchNodes": nodes,
+        "nps": round(nodes / seconds) if seconds else 0,
+        "peakMemory": max(result["peakMemory"] for result in results),
+    }
+    return report
+
+# mesures comparées à la baseline : plus grand est mieux, sauf la mémoire
+RATES = ("legalPlaysPerSecond", "actionsPerSecond", "evaluationsPerSecond")
+
+def compare(report, baseline, tolerance=0.1):
+    """
+        Compares a report with the reference move generator of perft.py and with the baseline (None for none).\n
+        Returns the differences of counts (a wrong move generator or a changed search)
+        and the measures worse than the baseline by more than the tolerance.
+    """
+    mismatches = []
+    regressions = []
+
+    def check(name, measure, value, reference, higherIsBetter=True):
+        change = value / reference - 1 if reference else 0
+        if (-change if higherIsBetter else change) > tolerance:
+            regressions.append(f"{name} {measure} : {value} against {reference} ({100 * change:+.0f}%)")
+
+    for name, result in report["positions"].items():
+        depth = len(result["referencePerft"])
+        if result["perft"][:depth] != result["referencePerft"]:
+            mismatches.append(f"{name} perft : {result['perft'][:depth]} against the reference {result['referencePerft']}")
+
+        reference = baseline["positions"].get(name) if baseline is not None else None
+        if reference is None:
+            continue
+
+        depth = min(len(result["perft"]), len(reference["perft"]))
+        if result["perft"][:depth] != reference["perft"][:depth]:
+            mismatches.append(f"{name} perft : {result['perft'][:depth]} against {reference['perft'][:depth]}")
+        if result["search"]["depth"] == reference["search"]["depth"] and result["search"]["nodes"] != reference["search"]["nodes"]:
+            mismatches.append(f"{name} search nodes : {result['search']['nodes']} against {reference['search']['nodes']}")
+
+        for measure in RATES:
+            check(name, measure, result[measure], reference[measure])
+        check(name, "nps", result["search"]["nps"], reference["search"]["nps"])
+        check(name, "peakMemory", result["peakMemory"], reference["peakMemory"], higherIsBetter=False)
+
+    return mismatches, regressions
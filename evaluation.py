@@ -0,0 +1,63 @@
+import numpy as np
+
+from hexgrid import CELLS, AXES, NEIGHBOURS, DISTANCE_SCALE, DISTANCE_UNITS
+
+"""
+    The heuristic of every child of a position in one NumPy call.
+
+    The marbles of the evaluated color in each child are the parent mask xored with the delta of the move,
+    unpacked into a (children, 61) occupancy array : the summed distance to the center is a dot product,
+    the population counts the pairs of neighbours present in both columns of the shifted occupancy.
+"""
+
+# bytes of a mask of 81 bits
+BYTES = 11
+POSITIONS = np.array(CELLS, dtype=np.intp)
+DISTANCES = np.array([DISTANCE_UNITS[cell] for cell in CELLS], dtype=np.int64)
+# chaque paire de voisins une seule fois : la bille et sa voisine dans les 3 directions des axes
+POSITION = {cell: position for position, cell in enumerate(CELLS)}
+PAIRS = [(POSITION[cell], POSITION[NEIGHBOURS[axis][cell]]) for axis in AXES for cell in CELLS if NEIGHBOURS[axis][cell] >= 0]
+FIRST = np.array([first for first, _ in PAIRS], dtype=np.intp)
+SECOND = np.array([second for _, second in PAIRS], dtype=np.intp)
+
+def occupancy(masks):
+    """
+        (len(masks), 61) array of 0 and 1, the boxes of CELLS set in each mask.
+    """
+    data = np.frombuffer(b"".join(mask.to_bytes(BYTES, "little") for mask in masks), dtype=np.uint8)
+    return np.unpackbits(data.reshape(len(masks), BYTES), axis=1, bitorder="little")[:, POSITIONS]
+
+def evaluate(board, moves, maximizer, weights):
+    """
+        Scores of heuristic(child, maximizer) for the children of the board after each move, all played by the same player,
+        and whether each child ends the game.\n
+        weights is (population, center, winning, win).
+    """
+    mover = moves[0].maximizer
+    mask = board.marbles[maximizer]
+    if mover == maximizer:
+        children = occupancy([mask ^ move.mineDelta for move in moves])
+        # une poussée hors du plateau ne change qu'une case adverse, la bille de tête
+        ejections = np.array([move.opponentDelta.bit_count() == 1 for move in moves])
+    else:
+        children = occupancy([mask ^ move.opponentDelta for move in moves])
+        ejections = np.zeros(len(moves), dtype=bool)
+
+    return score(children, 14 - board.count[not maximizer] + ejections, weights)
+
+def score(occupancy, out, weights):
+    """
+        heuristic of each row of a (positions, 61) occupancy array of the evaluated color, out being the
+        opposing marbles pushed out in each position, and whether each position ends the game.
+    """
+    population, center, winning, win = weights
+    count = occupancy.sum(axis=1)
+    # la somme entière en DISTANCE_UNITS puis la même division que heuristic : les mêmes flottants au bit près
+    distance = (occupancy.astype(np.int64) @ DISTANCES) / DISTANCE_SCALE
+    adjacency = 2 * (occupancy[:, FIRST] & occupancy[:, SECOND]).sum(axis=1)
+
+    # les termes dans l'ordre de heuristic
+    scores = population * adjacency + np.where(out >= 6, win, np.where(count <= 8, -win, 0))
+    scores = scores + np.divide(center, distance, out=np.full(len(occupancy), float(center)), where=distance > 0)
+    scores = scores + winning * out
+    return scores, (out >= 6) | (count <= 8)
@@ -0,0 +1,92 @@
+import math
+
+"""
+    Static geometry of the Abalone board, built once at import time.
+
+    The 61 hexes keep the coordinates of the server's 9x9 grid : the box [i, j] is the index i*9 + j,
+    and the bit i*9 + j of a mask. The tables are indexed by box (81 entries), the 20 "X" boxes
+    of the grid are never on the board and never set in a mask.
+"""
+
+moves = {
+    "NW":[-1, -1],
+    "NE":[-1,  0],
+    "E" :[ 0,  1],
+    "SW":[ 1,  0],
+    "SE":[ 1,  1],
+    "W" :[ 0, -1]
+}
+
+def onBoard(i, j):
+    return 0 <= i < 9 and 0 <= j < 9 and abs(i - j) <= 4
+
+CELLS = [i * 9 + j for i in range(9) for j in range(9) if onBoard(i, j)]
+FULL = sum(1 << cell for cell in CELLS)
+
+OPPOSITE = {"NW": "SE", "SE": "NW", "NE": "SW", "SW": "NE", "E": "W", "W": "E"}
+# a chain is a line along one of these 3 axes, each direction belongs to one axis
+AXES = ("E", "SW", "SE")
+AXIS = {name: (name if name in AXES else OPPOSITE[name]) for name in moves}
+
+OFFSETS = {name: vector[0] * 9 + vector[1] for name, vector in moves.items()}
+# boxes whose neighbour in the direction is still on the board, masking with it before the shift avoids wrapping on the next row
+SHIFTABLE = {
+    name: sum(1 << cell for cell in CELLS if onBoard(cell // 9 + vector[0], cell % 9 + vector[1]))
+    for name, vector in moves.items()
+}
+
+# neighbour of each box in each direction, -1 when it is out of the board
+NEIGHBOURS = {
+    name: [(cell + OFFSETS[name] if SHIFTABLE[name] >> cell & 1 else -1) for cell in range(81)]
+    for name in moves
+}
+DIRECTIONS = [(name, NEIGHBOURS[name]) for name in moves]
+# the 6 neighbours of each box as a mask
+NEIGHBOUR_MASKS = [sum(1 << NEIGHBOURS[name][cell] for name in moves if NEIGHBOURS[name][cell] >= 0) for cell in range(81)]
+# for each axis, its neighbour table and the 4 directions moving a chain of this axis sideways
+BROADSIDES = [
+    (axis, NEIGHBOURS[axis], [(name, NEIGHBOURS[name]) for name in moves if AXIS[name] != axis])
+    for axis in AXES
+]
+
+# distance of each box to the center [4, 4], the one used by Board.closeCenter
+CENTER_DISTANCE = [math.sqrt((cell // 9 - 4)**2 + (cell % 9 - 4)**2) for cell in range(81)]
+# the same distances in fixed point : their sums are integers, exact whatever the order of the moves
+DISTANCE_SCALE = 1 << 32
+DISTANCE_UNITS = [round(distance * DISTANCE_SCALE) for distance in CENTER_DISTANCE]
+
+def shift(mask, moveName):
+    """
+        Moves every marble of the mask one box in the direction, marbles leaving the board are dropped.
+    """
+    mask &= SHIFTABLE[moveName]
+    offset = OFFSETS[moveName]
+    return mask << offset if offset > 0 else mask >> -offset
+
+def bits(mask):
+    """
+        Iterates the box indexes of a mask, from the lowest to the highest.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def coordinates(mask):
+    """
+        Converts a mask into the sorted [i, j] list used by the server.
+    """
+    return [[cell // 9, cell % 9] for cell in bits(mask)]
+
+# every chain of 2 or 3 marbles as a mask, with its axis
+LINES = {}
+for axis in AXES:
+    following = NEIGHBOURS[axis]
+    for cell in CELLS:
+        second = following[cell]
+        if second < 0:
+            continue
+        LINES[1 << cell | 1 << second] = axis
+        third = following[second]
+        if third >= 0:
+            LINES[1 << cell | 1 << second | 1 << third] = axis
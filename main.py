@@ -1,17 +1,117 @@
 import socket as s
 import json
+import re
+import asyncio
 import time
 import sys
+import os
 import Abalone_V2 as av
-import math
+import parallel
+import openingbook
+import MonteCarloTreeSearch as mcts
+import logging
+from concurrent.futures import ThreadPoolExecutor
 
 
+# temps de réflexion par coup (en secondes), peut être changé avec le 2ème argument
+TIME_BUDGET = 2
+# nombre de processus pour la recherche (3ème argument), 1 = recherche dans le processus du serveur
+WORKERS = 1
+# continuer à chercher pendant le temps de l'adversaire (4ème argument, 0 pour désactiver)
+PONDER = True
+# une réflexion pendant le temps de l'adversaire dure au plus ce nombre de fois le temps d'un coup
+PONDER_BUDGETS = 3
+# algorithme de recherche (5ème argument) : "minimax" ou "mcts"
+ALGORITHM = "minimax"
+# options des moteurs minimax (7ème argument), par exemple "nullMove=0,reductions=1,delta=50",
+# "cache=128" donne la taille en Mo du cache des évaluations partagé par tous les moteurs du processus
+OPTIONS = {}
+
 class NotAJSONObject(Exception):
 	pass
 
 class Timeout(Exception):
 	pass
 
+class MessageTooLarge(Exception):
+	pass
+
+# caractères qui changent la profondeur ou l'état "dans une chaîne" du framer
+SPECIAL = re.compile(rb'[{}"\\]')
+WHITESPACE = b' \t\r\n'
+
+class JSONFramer:
+	"""
+		Découpe un flux d'octets en objets JSON.\n
+		Les octets reçus sont gardés tels quels (un caractère UTF-8 coupé entre deux morceaux reste entier),
+		seuls les '{', '}', '"' et '\\' sont regardés pour suivre la profondeur des accolades.\n
+		Quand la profondeur revient à 0, le message est décodé une seule fois avec raw_decode.
+	"""
+	def __init__(self, maxSize=1 << 20):
+		self.maxSize = maxSize
+		self.decoder = json.JSONDecoder()
+		self.buffer = bytearray()
+		self.position = 0 # premier octet pas encore parcouru
+		self.depth = 0
+		self.inString = False
+
+	def feed(self, data):
+		"""
+			Ajoute les octets reçus et retourne la liste des objets JSON complets qu'ils terminent.
+		"""
+		self.buffer += data
+		messages = []
+		buffer = self.buffer
+
+		while True:
+			if self.depth == 0:
+				# entre deux messages, seuls des espaces et le début d'un objet sont acceptés
+				start = self.position
+				while start < len(buffer) and buffer[start] in WHITESPACE:
+					start += 1
+				del buffer[:start]
+				self.position = 0
+				if not buffer:
+					break
+				if buffer[0] != ord('{'):
+					raise NotAJSONObject('Received message is not a JSON Object')
+
+			match = SPECIAL.search(buffer, self.position)
+			if match is None:
+				# un '\\' en fin de morceau a déjà fait passer la position après le caractère échappé à venir
+				self.position = max(self.position, len(buffer))
+				break
+
+			character = buffer[match.start()]
+			self.position = match.end()
+			if self.inString:
+				if character == ord('\\'):
+					# le caractère échappé ne compte pas, même si c'est un '"'
+					self.position += 1
+				elif character == ord('"'):
+					self.inString = False
+			elif character == ord('"'):
+				self.inString = True
+			elif character == ord('{'):
+				self.depth += 1
+			elif character == ord('}'):
+				self.depth -= 1
+				if self.depth == 0:
+					end = self.position
+					try:
+						obj, _ = self.decoder.raw_decode(buffer[:end].decode('utf8'))
+					except ValueError as e:
+						# JSON invalide entre les accolades ou octets qui ne sont pas de l'UTF-8
+						raise NotAJSONObject(f'Received message is not a valid JSON Object : {e}')
+					messages.append(obj)
+					del buffer[:end]
+					self.position = 0
+
+		if len(buffer) > self.maxSize:
+			raise MessageTooLarge(f'JSON message larger than {self.maxSize} bytes')
+
+		return messages
+
 
 def sendJSON(socket, obj):
 	"""
@@ -22,35 +122,33 @@ def sendJSON(socket, obj):
 	message = json.dumps(obj)
 	if message[0] != '{':
 		raise NotAJSONObject('sendJSON support only JSON Object Type')
-	message = message.encode('utf8')
-	total = 0
-	while total < len(message):
-		sent = socket.send(message[total:])
-		total += sent
+	socket.sendall(message.encode('utf8'))
 
-def receiveJSON(socket, timeout = 1):
+def receiveJSON(socket, timeout = 1, framer=None):
 	"""
 		Reçoit un socket et un timer, attend que le message soit reçu.\n
+		Le timer est une vraie limite : chaque recv n'attend que le temps qu'il reste.\n
 		Vérifie que le message est bien un JSON et le convertit.\n
 		Retourne l'objet JSON.
 	"""
 
-	finished = False
-	message = ''
-	data = ''
-	start = time.time()
-	while not finished:
-		message += socket.recv(4096).decode('utf8')
-		if len(message) > 0 and message[0] != '{':
-			raise NotAJSONObject('Received message is not a JSON Object')
+	framer = framer or JSONFramer()
+	deadline = time.time() + timeout
+	while True:
+		remaining = deadline - time.time()
+		if remaining <= 0:
+			raise Timeout()
+		socket.settimeout(remaining)
 		try:
-			data = json.loads(message)
-			finished = True
-		except json.JSONDecodeError:
-			if time.time() - start > timeout:
-				raise Timeout()
-	
-	return data
+			chunk = socket.recv(4096)
+		except s.timeout:
+			raise Timeout()
+		if not chunk:
+			raise NotAJSONObject('Connection closed before a complete JSON Object')
+
+		messages = framer.feed(chunk)
+		if messages:
+			return messages[0]
 
 def fetch(address, data, timeout=1):
 	"""
@@ -67,63 +165,179 @@ def fetch(address, data, timeout=1):
 	return response
 
 
-if __name__ == '__main__':
-	port = int(sys.argv[1])
+# un moteur (table de transposition, killers, historique) par partie en cours
+engines = {}
+# les moteurs des parties les plus anciennes sont oubliés au-delà de ce nombre
+MAX_ENGINES = 8
 
-	print("Start...")
+def matchEngine(state, factory=av.Engine):
+	"""
+		Retourne le moteur de la partie, reconnue aux joueurs de l'état.\n
+		Il est créé au premier coup de la partie par factory().
+	"""
+	key = tuple(state.get("players", ()))
+	if key not in engines:
+		if len(engines) >= MAX_ENGINES:
+			evicted = engines.pop(next(iter(engines)))
+			# la partie oubliée ne jouera plus, sa réflexion ne serait jamais arrêtée
+			if isinstance(evicted, av.Engine):
+				evicted.stopPondering()
+		engines[key] = factory()
+	return engines[key]
 
-	response = fetch(('127.0.0.1', 3000), {
-		"request": "subscribe",
-		"port": port,
-		"name": "zozo le donzo",
-		"matricules": ["18332", "20324"]
-	})
+# réponse quand le joueur n'a plus aucun move
+GIVE_UP = {"response": "giveup", "message": "plus de move"}
 
-	socket = s.socket(s.AF_INET, s.SOCK_STREAM)
-	
-	try:
-		socket.bind(('127.0.0.1', port))
-	except s.error as e:
-		print(e)
-	
-	print("Waiting for ping...")
+# livre d'ouvertures (openingbook.py), chargé au démarrage s'il existe
+book = None
+
+def play(data, budget, pool=None, algorithm=ALGORITHM):
+	"""
+		Cherche le coup à jouer pour une requête "play".\n
+		Retourne la réponse à envoyer au serveur et ce qu'il faut pour réfléchir pendant le tour de l'adversaire
+		(le moteur, le plateau, le joueur et la variation principale qui commence par le coup joué),
+		None avec MCTS qui garde son arbre d'un tour à l'autre.
+	"""
+	state = data["state"]
+	currentPlayer = state["current"]
 
-	socket = s.socket(s.AF_INET, s.SOCK_STREAM)
-	
-	try:
-		socket.bind(('127.0.0.1', port))
-	except s.error as e:
-		print(e)
-	
-	socket.listen()
+	if currentPlayer == 0:
+		player = False
+	else:
+		player = True
 
+	board = av.Board.fromGrid(state["board"])
+	# le serveur peut imposer son propre temps dans la requête
+	budget = data.get("budget", budget)
+
+	if algorithm == "mcts":
+		tree = matchEngine(state, lambda: mcts.MonteCarloTreeSearch(board, player))
+		tree.update(board, player)
+		tree.calculation_time = budget
+		move = tree.get_play()
+		if not move:
+			return dict(GIVE_UP), None
+		return {
+			"response":"move",
+			"move" : move.toJSON(),
+			"message":"il est tard"
+		}, None
+
+	engine = matchEngine(state, lambda: av.Engine(**OPTIONS))
+	# la table de transposition, les killers et l'historique restent en mémoire d'un tour à l'autre,
+	# si la position a été préparée pendant le tour de l'adversaire, ils sont gardés tels quels
+	if not engine.stopPondering(board):
+		engine.newSearch()
+
+	move = book.lookup(board, player) if book is not None else None
+	if move is not None:
+		return {
+			"response":"move",
+			"move" : move.toJSON(),
+			"message":"il est tôt"
+		}, (engine, board, player, [move])
+
+	score, move, depth, stats, pv = engine.iterativeDeepening(board, player, budget, pool=pool)
+	if not isinstance(move, av.Move):
+		return dict(GIVE_UP), None
+
+	return {
+		"response":"move",
+		"move" : move.toJSON(),
+		"message":"il est tard"
+	}, (engine, board, player, pv)
+
+async def readJSON(reader, timeout=1):
+	"""
+		Version asyncio de receiveJSON : lit les morceaux reçus jusqu'à avoir un objet JSON complet.
+	"""
+	framer = JSONFramer()
+	loop = asyncio.get_running_loop()
+	deadline = loop.time() + timeout
 	while True:
-		client, addr = socket.accept()
-		data = receiveJSON(client)
+		chunk = await asyncio.wait_for(reader.read(4096), deadline - loop.time())
+		if not chunk:
+			raise NotAJSONObject('Connection closed before a complete JSON Object')
+		messages = framer.feed(chunk)
+		if messages:
+			return messages[0]
 
-		if data["request"] == "ping":
-			sendJSON(client, {"response":"pong"})
-		elif data["request"] == "play":
-			board = data["state"]["board"]
-			currentPlayer = data["state"]["current"]
+async def writeJSON(writer, obj):
+	message = json.dumps(obj)
+	if message[0] != '{':
+		raise NotAJSONObject('sendJSON support only JSON Object Type')
+	writer.write(message.encode('utf8'))
+	await writer.drain()
 
-			if currentPlayer == 0:
-				player = False
+async def serve(port, budget, pool=None, ponder=PONDER, algorithm=ALGORITHM):
+	"""
+		Serveur asyncio : chaque connexion est traitée dans sa propre tâche.\n
+		Les recherches tournent dans un executor, un "ping" reçu pendant une recherche reçoit sa réponse tout de suite.\n
+		Avec ponder, la recherche continue sur les réponses probables de l'adversaire une fois le coup envoyé.
+	"""
+	loop = asyncio.get_running_loop()
+	searches = ThreadPoolExecutor()
+	# les réflexions ont leurs propres threads : une recherche n'attend jamais derrière elles
+	ponders = ThreadPoolExecutor(MAX_ENGINES)
+
+	async def handleClient(reader, writer):
+		try:
+			data = await readJSON(reader)
+			request = data.get("request")
+
+			if request == "ping":
+				await writeJSON(writer, {"response":"pong"})
+			elif request == "play":
+				response, pondering = await loop.run_in_executor(searches, play, data, budget, pool, algorithm)
+				await writeJSON(writer, response)
+				if ponder and pondering is not None:
+					engine, board, player, pv = pondering
+					# pas attendu : la requête "play" suivante l'arrête avec stopPondering, sinon elle s'arrête seule
+					loop.run_in_executor(ponders, engine.ponder, board, player, pv, engine.ponderId, PONDER_BUDGETS * budget)
 			else:
-				player = True
+				logging.warning("request dropped : unknown request %r", request)
+		# KeyError et TypeError : une requête "play" sans l'état attendu
+		except (NotAJSONObject, MessageTooLarge, KeyError, TypeError, asyncio.TimeoutError, ConnectionError) as e:
+			logging.warning("request dropped : %r", e)
+		finally:
+			writer.close()
+
+	server = await asyncio.start_server(handleClient, '127.0.0.1', port)
+	print("Waiting for ping...")
+
+	response = await loop.run_in_executor(None, fetch, ('127.0.0.1', 3000), {
+		"request": "subscribe",
+		"port": port,
+		"name": "zozo le donzo",
+		"matricules": ["18332", "20324"]
+	})
 
-			state = av.Board(board)
-			score, move = av.minimax(state, 2, True, player, - math.inf, math.inf)
+	async with server:
+		await server.serve_forever()
 
-			print(move)
 
-			sendJSON(client, {
-				"response":"move",
-				"move" : {
-					"marbles": move[0],
-					"direction": move[1]
-				},
-				"message":"il est tard"
-			})
+if __name__ == '__main__':
+	port = int(sys.argv[1])
+	budget = float(sys.argv[2]) if len(sys.argv) > 2 else TIME_BUDGET
+	workers = int(sys.argv[3]) if len(sys.argv) > 3 else WORKERS
+	ponder = bool(int(sys.argv[4])) if len(sys.argv) > 4 else PONDER
+	algorithm = sys.argv[5] if len(sys.argv) > 5 else ALGORITHM
+	# poids de l'heuristique (6ème argument) : "population,center,winning,win", par exemple "1,2000,30,200"
+	if len(sys.argv) > 6:
+		av.setWeights(*(float(weight) for weight in sys.argv[6].split(",")))
+	if len(sys.argv) > 7:
+		for option in sys.argv[7].split(","):
+			name, value = option.split("=")
+			if name == "cache":
+				av.setCacheSize(int(value))
+			else:
+				OPTIONS[name] = int(value) if value.lstrip("-").isdigit() else float(value)
+	# après setWeights : les processus de la recherche parallèle reçoivent les poids, la taille du cache et les options à leur création
+	pool = parallel.RootParallelSearch(workers, OPTIONS) if workers > 1 else None
+	if os.path.exists(openingbook.BOOK):
+		book = openingbook.OpeningBook(openingbook.BOOK)
+
+	logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+	print("Start...")
 
-		client.close()
\ No newline at end of file
+	asyncio.run(serve(port, budget, pool, ponder, algorithm))
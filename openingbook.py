@@ -0,0 +1,170 @@
+import os
+import sys
+import math
+import mmap
+import time
+import struct
+
+import Abalone_V2 as av
+from hexgrid import moves, bits
+
+"""
+    Opening book : the best move of the positions of the first plies, searched offline.
+
+    The file is a header followed by fixed-size records sorted by key, the key being the one
+    of the root of a search (av.tableKey(board, True, turn)). It is opened with mmap and
+    searched by bisection, nothing is read at startup and the pages are shared by the processes.
+"""
+
+MAGIC = b"ABABOOK1"
+# magic, number of records
+HEADER = struct.Struct("<8sQ")
+# key, the 3 boxes of the chain (NONE when shorter), the index of the direction in moves, the depth searched
+RECORD = struct.Struct("<Q3BBB3x")
+NONE = 255
+DIRECTION_NAMES = list(moves)
+
+# à côté des sources, main.py le charge s'il existe
+BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+def encodeMove(move):
+    cells = list(bits(move.marbles))
+    cells += [NONE] * (3 - len(cells))
+    return cells, DIRECTION_NAMES.index(move.direction)
+
+def write(path, entries):
+    """
+        Writes the book, entries maps a key to its (move, depth).
+    """
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(entries)))
+        for key in sorted(entries):
+            move, depth = entries[key]
+            cells, direction = encodeMove(move)
+            file.write(RECORD.pack(key, *cells, direction, depth))
+
+class OpeningBook:
+    """
+        Read-only view of a book file.
+    """
+    def __init__(self, path=BOOK):
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or HEADER.size + self.size * RECORD.size > len(self.data):
+            raise ValueError(f"{path} is not an opening book")
+
+    def __len__(self):
+        return self.size
+
+    def record(self, index):
+        return RECORD.unpack_from(self.data, HEADER.size + index * RECORD.size)
+
+    def find(self, key):
+        """
+            Returns the record of the key or None.
+        """
+        low = 0
+        high = self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.record(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.size:
+            record = self.record(low)
+            if record[0] == key:
+                return record
+        return None
+
+    def lookup(self, state, turn):
+        """
+            Returns the book move of the player to move, or None when the position is not in the book.\n
+            The move is checked against the legal moves, a key collision never plays an illegal move.
+        """
+        record = self.find(av.tableKey(state, True, turn))
+        if record is None:
+            return None
+
+        _, first, second, third, direction, depth = record
+        marbles = sum(1 << cell for cell in (first, second, third) if cell != NONE)
+        direction = DIRECTION_NAMES[direction]
+        for move in state.generateMoves(turn):
+            if move.marbles == marbles and move.direction == direction:
+                return move
+        return None
+
+    def close(self):
+        self.data.close()
+
+def rankByPlayouts(board, turn, successors, games):
+    """
+        Sorts the moves by the score of random games played after them, the best for the player first.
+    """
+    import rollouts
+
+    def score(successor):
+        child = board.copy()
+        child.make_move(successor)
+        result = rollouts.playouts(child, not turn, games, 60, seed=0).score
+        return result if turn else 1 - result
+
+    return sorted(successors, key=score, reverse=True)
+
+def build(depth=4, plies=4, width=3, roots=None, engine=None, playouts=0):
+    """
+        Searches every position of the first plies at the given depth and returns the entries of write.\n
+        From each position the book follows the move found and the next width - 1 moves in search order,
+        both players are searched : the book answers whichever side we play.\n
+        With playouts, the other moves followed are the best of twice as many by the score of
+        that many random games (rollouts.playouts, needs numpy).
+    """
+    engine = engine or av.Engine()
+    if roots is None:
+        start = av.Board.fromGrid(av.STANDARD)
+        roots = [(start, False), (start, True)]
+
+    entries = {}
+    # les positions à chercher, une transposition n'y est qu'une fois
+    frontier = {board.position(turn) for board, turn in roots}
+    for ply in range(plies + 1):
+        following = set()
+        for position in frontier:
+            board = position.board()
+            turn = position.turn
+            key = av.tableKey(board, True, turn)
+            if key in entries or board.is_terminal():
+                continue
+
+            engine.newSearch()
+            score, move = engine.minimax(board, depth, True, turn, -math.inf, math.inf)
+            if move == -1:
+                continue
+            entries[key] = (move, depth)
+
+            if ply < plies:
+                successors = board.legal_plays(turn)
+                engine.orderMoves(successors, move)
+                if playouts:
+                    successors = [move] + rankByPlayouts(board, turn, successors[1:2 * width], playouts)
+                for successor in successors[:width]:
+                    board.make_move(successor)
+                    following.add(board.position(not turn))
+                    board.unmake_move(successor)
+        print(f"ply {ply} : {len(entries)} positions")
+        frontier = following
+    return entries
+
+if __name__ == '__main__':
+    # python openingbook.py [depth] [plies] [width] [path] [playouts] : builds the book of the standard layout
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    plies = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    width = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    path = sys.argv[4] if len(sys.argv) > 4 else BOOK
+    playouts = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+
+    begin = time.time()
+    entries = build(depth, plies, width, playouts=playouts)
+    write(path, entries)
+    print(f"{len(entries)} positions written to {path} ({os.path.getsize(path)} bytes) in {time.time() - begin:.1f} s")
@@ -0,0 +1,170 @@
+import math
+import os
+import sys
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import Abalone_V2 as av
+from transposition import EXACT
+
+"""
+    Root-parallel minimax (young brothers wait).
+
+    The first root move is searched alone to get an alpha bound, the other root moves are then
+    shared between the processes of the pool. Every process reads the best score found so far
+    from a shared value before searching its move and raises it when it finds better.
+    A position travels as an av.Position and a move as the plain tuple of its fields.
+"""
+
+# best root score found so far, shared by the processes of the pool
+sharedAlpha = None
+
+def initWorker(alpha, weights, cacheSize, options):
+    global sharedAlpha
+    sharedAlpha = alpha
+    # les processus lancés avec "spawn" (Windows) repartent des poids par défaut
+    av.setWeights(*weights)
+    av.setCacheSize(cacheSize)
+    if options:
+        av.engine = av.Engine(**options)
+
+def searchRootMove(position, fields, depth, deadline, age):
+    """
+        Searches one root move in a worker with its own engine (transposition table, killers and history).\n
+        Returns the score, whether it is exact (False when it is only an upper bound below alpha)
+        and the SearchStats of the worker, or None when the deadline is reached.
+    """
+    board = av.Board.fromPosition(position)
+    turn = position.turn
+    move = av.Move(*fields)
+    av.engine.table.age = age
+    av.engine.stats = av.SearchStats()
+
+    alpha = sharedAlpha.value
+    board.make_move(move)
+    try:
+        score = av.engine.minimax(board, depth - 1, False, not turn, alpha, math.inf, deadline, 1)[0]
+    except av.SearchTimeout:
+        return None
+
+    if score <= alpha:
+        return score, False, av.engine.stats
+
+    with sharedAlpha.get_lock():
+        if score > sharedAlpha.value:
+            sharedAlpha.value = score
+    return score, True, av.engine.stats
+
+class RootParallelSearch:
+    """
+        Pool of processes kept for the whole game, give it to av.iterativeDeepening.
+    """
+    def __init__(self, workers=None, options=None):
+        self.workers = workers or os.cpu_count()
+        # les processus démarrent à la première recherche, depuis un thread du serveur : un fork copierait
+        # les verrous tenus par les autres threads (celui de evaluationCache), ils sont lancés par spawn
+        context = multiprocessing.get_context("spawn")
+        self.alpha = context.Value("d", -math.inf)
+        # options : arguments of the av.Engine of every worker, the switches of the search
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=initWorker,
+                                            initargs=(self.alpha, (av.POPULATION, av.CENTER, av.WINNING, av.WIN),
+                                                      av.evaluationCache.megabytes, options))
+        # the shared alpha belongs to one root search, searches of different games take turns
+        self.lock = threading.Lock()
+
+    def search(self, state, depth, turn, deadline=None, engine=av.engine):
+        """
+            Same result as engine.minimax(state, depth, True, turn, -inf, inf) for the root player.
+        """
+        with self.lock:
+            return self.searchRoot(state, depth, turn, deadline, engine)
+
+    def searchRoot(self, state, depth, turn, deadline, engine):
+        table = engine.table
+        key = av.tableKey(state, True, turn)
+        entry = table.get(key)
+        successors = state.legal_plays(turn)
+        engine.orderMoves(successors, entry.move if entry is not None else None)
+
+        if not successors:
+            return -math.inf, -1
+
+        # the eldest brother is searched alone, its score is the first alpha of the other moves
+        first = successors[0]
+        state.make_move(first)
+        try:
+            alpha = engine.minimax(state, depth - 1, False, not turn, -math.inf, math.inf, deadline, 1)[0]
+        finally:
+            state.unmake_move(first)
+        best = first
+        self.alpha.value = alpha
+
+        position = state.position(turn)
+        futures = {
+            self.executor.submit(searchRootMove, position, tuple(move), depth, deadline, table.age): move
+            for move in successors[1:]
+        }
+
+        for future in as_completed(futures):
+            result = future.result()
+            if result is None:
+                for pending in futures:
+                    pending.cancel()
+                raise av.SearchTimeout()
+
+            score, exact, stats = result
+            engine.stats.add(stats)
+            if exact and score > alpha:
+                alpha = score
+                best = futures[future]
+
+        table.put(key, depth, alpha, EXACT, best)
+        return alpha, best
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+if __name__ == '__main__':
+    # python parallel.py [depth] [workers] : speedup of the root-parallel search from 1 to N processes
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    maxWorkers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+
+    start = av.Board.fromGrid([
+        ["W", "W", "W", "W", "W", "X", "X", "X", "X"],
+        ["W", "W", "W", "W", "W", "W", "X", "X", "X"],
+        ["E", "E", "W", "W", "W", "E", "E", "X", "X"],
+        ["E", "E", "E", "E", "E", "E", "E", "E", "X"],
+        ["E", "E", "E", "E", "E", "E", "E", "E", "E"],
+        ["X", "E", "E", "E", "E", "E", "E", "E", "E"],
+        ["X", "X", "E", "E", "B", "B", "B", "E", "E"],
+        ["X", "X", "X", "B", "B", "B", "B", "B", "B"],
+        ["X", "X", "X", "X", "B", "B", "B", "B", "B"]])
+    middle = av.Board.fromGrid([
+        ["E", "E", "E", "E", "E", "X", "X", "X", "X"],
+        ["E", "E", "E", "E", "W", "E", "X", "X", "X"],
+        ["E", "E", "W", "W", "W", "W", "E", "X", "X"],
+        ["E", "W", "B", "W", "W", "W", "B", "B", "X"],
+        ["E", "E", "B", "B", "W", "W", "B", "B", "W"],
+        ["X", "E", "B", "B", "W", "W", "E", "E", "E"],
+        ["X", "X", "E", "E", "E", "B", "B", "B", "E"],
+        ["X", "X", "X", "E", "B", "E", "E", "B", "E"],
+        ["X", "X", "X", "X", "E", "E", "E", "E", "E"]])
+    positions = [(start, True), (start, False), (middle, True), (middle, False)]
+
+    def timeSearch(search):
+        begin = time.time()
+        for board, turn in positions:
+            search(board, turn)
+        return time.time() - begin
+
+    serial = timeSearch(lambda board, turn: av.Engine().minimax(board, depth, True, turn, -math.inf, math.inf))
+    print(f"depth {depth}, {len(positions)} positions")
+    print(f"serial minimax : {serial:.2f} s")
+
+    for workers in range(1, maxWorkers + 1):
+        pool = RootParallelSearch(workers)
+        elapsed = timeSearch(lambda board, turn: pool.search(board, depth, turn, engine=av.Engine()))
+        pool.close()
+        print(f"{workers} worker(s) : {elapsed:.2f} s, speedup {serial / elapsed:.2f}")
@@ -0,0 +1,290 @@
+import sys
+import time
+import random
+
+import Abalone_V2 as av
+
+"""
+    Perft : number of leaves of the move tree at a given depth, and the slow reference it is checked against.
+
+    The reference works on the server's 9x9 grid of "W", "B", "E" and "X" with nothing but the rules :
+    it does not use hexgrid, the masks or the Board, so a bug of the move generator cannot be in both.
+
+    python perft.py depth [position] [divide]   counts from a position of the benchmark corpus (standard-black by default)
+    python perft.py check [depth] [games]       compares Board with the reference on the corpus and on random games
+    python perft.py totals [games] [plies]      compares the running totals of Board with a full recompute on random games
+"""
+
+def perft(state, turn, depth):
+    """
+        Number of leaves of the move tree at the given depth, a finished game is a leaf.
+    """
+    if depth == 0 or state.is_terminal():
+        return 1
+    successors = state.legal_plays(turn)
+    if depth == 1:
+        return len(successors)
+
+    count = 0
+    for move in successors:
+        state.make_move(move)
+        count += perft(state, not turn, depth - 1)
+        state.unmake_move(move)
+    return count
+
+def divide(state, turn, depth):
+    """
+        perft of each root move : the list of (move, count).
+    """
+    result = []
+    for move in state.legal_plays(turn):
+        state.make_move(move)
+        result.append((move, perft(state, not turn, depth - 1)))
+        state.unmake_move(move)
+    return result
+
+# --- référence lente, écrite directement avec les règles sur la grille ---
+
+VECTORS = {"NW": (-1, -1), "NE": (-1, 0), "E": (0, 1), "SW": (1, 0), "SE": (1, 1), "W": (0, -1)}
+
+def inside(grid, i, j):
+    return 0 <= i < 9 and 0 <= j < 9 and grid[i][j] != "X"
+
+def referenceMoves(grid, color):
+    """
+        Every legal move of the color ("W" or "B") as (sorted marbles, direction), marbles being (i, j) tuples.
+    """
+    opponent = "B" if color == "W" else "W"
+    own = [(i, j) for i in range(9) for j in range(9) if grid[i][j] == color]
+
+    groups = set()
+    for i, j in own:
+        groups.add(((i, j),))
+        for name in ("E", "SW", "SE"):
+            di, dj = VECTORS[name]
+            line = [(i, j)]
+            for step in (1, 2):
+                ni, nj = i + step * di, j + step * dj
+                if not inside(grid, ni, nj) or grid[ni][nj] != color:
+                    break
+                line.append((ni, nj))
+                groups.add(tuple(sorted(line)))
+
+    result = []
+    for group in groups:
+        for name, (di, dj) in VECTORS.items():
+            targets = [(i + di, j + dj) for i, j in group]
+            if len(group) == 1 or targets[0] in group or targets[-1] in group:
+                # dans l'axe : seule la case devant la bille de tête compte
+                head = next((i, j) for i, j in group if (i + di, j + dj) not in group)
+                i, j = head[0] + di, head[1] + dj
+                pushed = 0
+                while inside(grid, i, j) and grid[i][j] == opponent:
+                    pushed += 1
+                    i, j = i + di, j + dj
+                if pushed == 0:
+                    legal = inside(grid, i, j) and grid[i][j] == "E"
+                else:
+                    legal = pushed < len(group) and (not inside(grid, i, j) or grid[i][j] == "E")
+            else:
+                # de côté : chaque bille va sur une case vide
+                legal = all(inside(grid, i, j) and grid[i][j] == "E" for i, j in targets)
+            if legal:
+                result.append((group, name))
+    return result
+
+def referencePlay(grid, group, name):
+    """
+        New grid after the move, the opposing marbles in front of the group are pushed, the ones leaving the board are removed.
+    """
+    di, dj = VECTORS[name]
+    moving = list(group)
+    if len(group) == 1 or (group[0][0] + di, group[0][1] + dj) in group or (group[-1][0] + di, group[-1][1] + dj) in group:
+        color = grid[group[0][0]][group[0][1]]
+        head = next((i, j) for i, j in group if (i + di, j + dj) not in group)
+        i, j = head[0] + di, head[1] + dj
+        while inside(grid, i, j) and grid[i][j] not in ("E", color):
+            moving.append((i, j))
+            i, j = i + di, j + dj
+
+    result = [list(row) for row in grid]
+    for i, j in moving:
+        result[i][j] = "E"
+    for i, j in moving:
+        if inside(grid, i + di, j + dj):
+            result[i + di][j + dj] = grid[i][j]
+    return result
+
+def referencePushes(grid, group, name):
+    """
+        Whether the move moves opposing marbles.
+    """
+    opponent = "B" if grid[group[0][0]][group[0][1]] == "W" else "W"
+    result = referencePlay(grid, group, name)
+    return any(grid[i][j] == opponent and result[i][j] != opponent for i in range(9) for j in range(9))
+
+def referenceFinished(grid):
+    for color in ("W", "B"):
+        if sum(row.count(color) for row in grid) <= 8:
+            return True
+    return False
+
+def referencePerft(grid, color, depth):
+    if depth == 0 or referenceFinished(grid):
+        return 1
+    successors = referenceMoves(grid, color)
+    if depth == 1:
+        return len(successors)
+    opponent = "B" if color == "W" else "W"
+    return sum(referencePerft(referencePlay(grid, group, name), opponent, depth - 1) for group, name in successors)
+
+def compareMoves(grid, turn):
+    """
+        Differences between Board and the reference in one position : the missing moves, the extra moves
+        and the moves whose resulting grid differs.
+    """
+    board = av.Board.fromGrid(grid)
+    color = "W" if turn else "B"
+    reference = {(group, name): referencePlay(grid, group, name) for group, name in referenceMoves(grid, color)}
+
+    generated = {}
+    for move in board.legal_plays(turn):
+        key = (tuple(tuple(marble) for marble in move.chain()), move.direction)
+        board.make_move(move)
+        generated[key] = board.toGrid()
+        board.unmake_move(move)
+
+    missing = [key for key in reference if key not in generated]
+    extra = [key for key in generated if key not in reference]
+    different = [key for key in reference if key in generated and reference[key] != generated[key]]
+    return missing, extra, different
+
+def check(depth=2, games=20, plies=60, seed=0):
+    """
+        Compares Board with the reference : perft to depth on the corpus, and every move of the positions
+        of random games played with the reference. Returns the list of the differences found.
+    """
+    from benchmarks.corpus import CORPUS
+
+    errors = []
+    for name, (grid, turn) in CORPUS.items():
+        board = av.Board.fromGrid(grid)
+        for level in range(1, depth + 1):
+            mine = perft(board, turn, level)
+            theirs = referencePerft(grid, "W" if turn else "B", level)
+            if mine != theirs:
+                errors.append(f"{name} perft {level} : {mine} against {theirs}")
+
+    generator = random.Random(seed)
+    positions = 0
+    for game in range(games):
+        grid, turn = CORPUS["standard-black"]
+        for _ in range(plies):
+            if referenceFinished(grid):
+                break
+            missing, extra, different = compareMoves(grid, turn)
+            positions += 1
+            for kind, keys in (("missing", missing), ("extra", extra), ("different result", different)):
+                for key in keys:
+                    errors.append(f"game {game} : {kind} {key} in {grid}")
+            successors = referenceMoves(grid, "W" if turn else "B")
+            if not successors:
+                break
+            # les poussées sont rares au hasard, elles sont choisies une fois sur deux quand il y en a
+            pushes = [(group, name) for group, name in successors if referencePushes(grid, group, name)]
+            group, name = generator.choice(pushes if pushes and generator.random() < 0.5 else successors)
+            grid = referencePlay(grid, group, name)
+            turn = not turn
+
+    print(f"{positions} positions of random games compared")
+    return errors
+
+# --- totaux de l'heuristique tenus à jour par Board ---
+
+def totalsDifference(board):
+    """
+        Description of the difference between the running totals of the board and Board.computeTotals, None when they agree.
+    """
+    count, centerDistance, adjacency = board.computeTotals()
+    # des entiers, égaux au bit près après n'importe quelle suite de coups et de retours
+    if board.count != count or board.centerDistance != centerDistance or board.adjacency != adjacency:
+        return f"running {board.count} {board.centerDistance} {board.adjacency} against {count} {centerDistance} {adjacency}"
+    return None
+
+def checkTotals(games=20, plies=200, seed=0):
+    """
+        Compares the running totals with a full recompute after every move of random games,
+        and after a move played and undone in each position. Returns the list of the differences found.
+    """
+    from benchmarks.corpus import CORPUS
+
+    errors = []
+    generator = random.Random(seed)
+    positions = 0
+    for game in range(games):
+        board = av.Board.fromGrid(CORPUS["standard-black"][0])
+        turn = False
+        for ply in range(plies):
+            if board.is_terminal():
+                break
+            successors = board.legal_plays(turn)
+            if not successors:
+                break
+
+            tried = generator.choice(successors)
+            board.make_move(tried)
+            difference = totalsDifference(board)
+            board.unmake_move(tried)
+            difference = difference or totalsDifference(board)
+            if difference is not None:
+                errors.append(f"game {game} ply {ply} after {tried.chain()} {tried.direction} and back : {difference}")
+
+            # les poussées sont rares au hasard, elles sont choisies une fois sur deux quand il y en a
+            pushes = [move for move in successors if move.opponentDelta]
+            move = generator.choice(pushes if pushes and generator.random() < 0.5 else successors)
+            board.make_move(move)
+            positions += 1
+            difference = totalsDifference(board)
+            if difference is not None:
+                errors.append(f"game {game} ply {ply} after {move.chain()} {move.direction} : {difference}")
+            turn = not turn
+
+    print(f"{positions} positions of random games compared")
+    return errors
+
+if __name__ == '__main__':
+    from benchmarks.corpus import CORPUS
+
+    if len(sys.argv) > 1 and sys.argv[1] == "totals":
+        games = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+        plies = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+        errors = checkTotals(games, plies)
+        for error in errors:
+            print(error)
+        print("OK" if not errors else f"{len(errors)} differences")
+        sys.exit(1 if errors else 0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "check":
+        depth = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+        games = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+        errors = check(depth, games)
+        for error in errors:
+            print(error)
+        print("OK" if not errors else f"{len(errors)} differences")
+        sys.exit(1 if errors else 0)
+
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    name = sys.argv[2] if len(sys.argv) > 2 else "standard-black"
+    grid, turn = CORPUS[name]
+    board = av.Board.fromGrid(grid)
+
+    begin = time.time()
+    if len(sys.argv) > 3 and sys.argv[3] == "divide":
+        total = 0
+        for move, count in divide(board, turn, depth):
+            print(f"{move.chain()} {move.direction} : {count}")
+            total += count
+    else:
+        total = perft(board, turn, depth)
+    elapsed = time.time() - begin
+    print(f"perft {depth} of {name} : {total} leaves in {elapsed:.2f} s ({total / elapsed:.0f} leaves/s)")
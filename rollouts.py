@@ -0,0 +1,208 @@
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import Abalone_V2 as av
+import evaluation
+from hexgrid import moves, CELLS, NEIGHBOURS
+
+"""
+    Random playouts of many games at once with NumPy.
+
+    A batch is a (games, 62) array : one row per game, one column per hex of the board (the 61 boxes of
+    CELLS in order) and a last column that is always OFF, the neighbour of the boxes of the edge.
+    Every step samples a few random moves per game, keeps the first legal one of each game and plays
+    all of them together with index arrays. The player to move is the same in every game.
+"""
+
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+OFF = 3
+# ligne du plateau dont les voisins hors plateau sont tous cette colonne
+SENTINEL = len(CELLS)
+
+DIRECTION_NAMES = list(moves)
+OPPOSITE_INDEX = np.array([DIRECTION_NAMES.index(name) for name in ("SE", "SW", "W", "NE", "NW", "E")])
+POSITION = {cell: position for position, cell in enumerate(CELLS)}
+# NEXT[direction, position] : position of the neighbour, SENTINEL out of the board (and for the sentinel itself)
+NEXT = np.array([
+    [POSITION[NEIGHBOURS[name][cell]] if NEIGHBOURS[name][cell] >= 0 else SENTINEL for cell in CELLS] + [SENTINEL]
+    for name in DIRECTION_NAMES
+], dtype=np.intp)
+
+# draws : the games still running at the end, scored by their evaluation
+BatchResult = namedtuple("BatchResult", "games whiteWins blackWins draws score")
+
+def fromBoard(board, games):
+    """
+        Batch of copies of the board.
+    """
+    row = np.full(SENTINEL + 1, OFF, dtype=np.int8)
+    for position, cell in enumerate(CELLS):
+        if board.marbles[True] >> cell & 1:
+            row[position] = WHITE
+        elif board.marbles[False] >> cell & 1:
+            row[position] = BLACK
+        else:
+            row[position] = EMPTY
+    return np.tile(row, (games, 1))
+
+def outs(cells):
+    """
+        Marbles pushed out of each game : (black, white).
+    """
+    return 14 - (cells == BLACK).sum(axis=1), 14 - (cells == WHITE).sum(axis=1)
+
+def propose(cells, game, own, opponent, rng, tries):
+    """
+        Samples tries random moves in each game of the index array game and keeps the first legal one.\n
+        Returns the games that found one and, for them, the move as arrays :
+        direction, length, inline, the 3 positions of the chain (head first) and where the pushed line ends.
+    """
+    cells = cells[game]
+    rows = np.arange(len(game))[:, None]
+
+    # une bille au hasard du joueur par essai : le max d'une clé aléatoire sur ses billes
+    keys = rng.random((len(game), tries, SENTINEL + 1)) * (cells == own)[:, None, :]
+    start = keys.argmax(axis=2)
+    direction = rng.integers(0, 6, (len(game), tries))
+    length = rng.integers(1, 4, (len(game), tries))
+    axis = rng.integers(0, 6, (len(game), tries))
+    # un move dans l'axe de la chaîne : la chaîne est derrière la bille de tête
+    inline = (length == 1) | (axis == direction) | (axis == OPPOSITE_INDEX[direction])
+    axis = np.where(inline, OPPOSITE_INDEX[direction], axis)
+
+    chain = [start, NEXT[axis, start]]
+    chain.append(NEXT[axis, chain[1]])
+    values = [cells[rows, position] for position in chain]
+    legal = (values[0] == own) & ((length < 2) | (values[1] == own)) & ((length < 3) | (values[2] == own))
+
+    # dans l'axe : la case devant est vide, ou une ligne adverse plus courte suivie d'une case vide ou du bord
+    ahead = [NEXT[direction, start]]
+    for _ in range(2):
+        ahead.append(NEXT[direction, ahead[-1]])
+    front = [cells[rows, position] for position in ahead]
+    pushed = np.where(front[0] != opponent, 0, np.where(front[1] != opponent, 1, np.where(front[2] != opponent, 2, 3)))
+    after = np.where(pushed == 1, front[1], front[2])
+    inlineLegal = (front[0] == EMPTY) | ((pushed >= 1) & (pushed < length) & ((after == EMPTY) | (after == OFF)))
+
+    # de côté : chaque bille de la chaîne va sur une case vide
+    sideLegal = np.ones_like(legal)
+    for index in range(3):
+        target = cells[rows, NEXT[direction, chain[index]]]
+        sideLegal &= (length <= index) | (target == EMPTY)
+
+    legal &= np.where(inline, inlineLegal, sideLegal)
+
+    chosen = legal.argmax(axis=1)
+    found = np.nonzero(legal[np.arange(len(game)), chosen])[0]
+    pick = chosen[found]
+
+    def select(array):
+        return array[found, pick]
+
+    pushed = select(pushed)
+    pushEnd = np.where(pushed == 0, SENTINEL, np.where(pushed == 1, select(ahead[1]), select(ahead[2])))
+    return (game[found], select(direction), select(length), select(inline),
+            [select(position) for position in chain], pushEnd)
+
+def step(cells, active, turn, rng, tries=8, rounds=4):
+    """
+        Plays one random legal move of the player to move in every active game and returns the number of moves played.\n
+        The games without a legal move among their tries sample again, up to rounds times ;
+        a game that still has none passes, it only happens in positions with very few moves.
+    """
+    own = WHITE if turn else BLACK
+    opponent = BLACK if turn else WHITE
+
+    proposals = []
+    pending = np.nonzero(active)[0]
+    for _ in range(rounds):
+        if not len(pending):
+            break
+        proposal = propose(cells, pending, own, opponent, rng, tries)
+        proposals.append(proposal)
+        pending = np.setdiff1d(pending, proposal[0], assume_unique=True)
+
+    if not proposals:
+        return 0
+    game, direction, length, inline, first, second, third, pushEnd = (
+        np.concatenate(arrays) for arrays in zip(*((found, direction, length, inline, *chain, pushEnd)
+            for found, direction, length, inline, chain, pushEnd in proposals))
+    )
+    chain = [first, second, third]
+
+    # dans l'axe : la queue de la chaîne se vide, la case devant reçoit une bille, la ligne poussée avance d'une case
+    line = game[inline]
+    tail = np.choose(length[inline] - 1, [chain[0][inline], chain[1][inline], chain[2][inline]])
+    cells[line, tail] = EMPTY
+    cells[line, NEXT[direction[inline], chain[0][inline]]] = own
+    cells[line, pushEnd[inline]] = opponent
+
+    # de côté : les billes quittent leurs cases puis arrivent sur les cases voisines
+    side = ~inline
+    for index in range(3):
+        moving = side & (length > index)
+        cells[game[moving], chain[index][moving]] = EMPTY
+    for index in range(3):
+        moving = side & (length > index)
+        cells[game[moving], NEXT[direction[moving], chain[index][moving]]] = own
+
+    # une bille poussée hors du plateau, ou d'un move sans poussée, a été écrite dans la colonne sentinelle
+    cells[:, SENTINEL] = OFF
+    return len(game)
+
+def evaluate(cells, scale):
+    """
+        Chance of white winning each game from the heuristic difference, the same logistic as the
+        scalar rollouts of MonteCarloTreeSearch : a difference of scale gives 73%.
+    """
+    weights = (av.POPULATION, av.CENTER, av.WINNING, av.WIN)
+    blackOut, whiteOut = outs(cells)
+    board = cells[:, :SENTINEL]
+    white = evaluation.score(board == WHITE, blackOut, weights)[0]
+    black = evaluation.score(board == BLACK, whiteOut, weights)[0]
+    return 1 / (1 + np.exp(-(white - black) / scale))
+
+def playouts(board, turn, games=256, maxMoves=200, seed=None, tries=8, scale=100):
+    """
+        Plays games random games from the board and returns their BatchResult.\n
+        score is the mean result for white : 1 for a win, 0 for a loss and, for the games still running
+        after maxMoves (a few random moves rarely push a marble out), their evaluation with the logistic of evaluate.
+    """
+    rng = np.random.default_rng(seed)
+    cells = fromBoard(board, games)
+    active = np.ones(games, dtype=bool)
+
+    for _ in range(maxMoves):
+        blackOut, whiteOut = outs(cells)
+        active = (blackOut < 6) & (whiteOut < 6)
+        if not active.any():
+            break
+        step(cells, active, turn, rng, tries)
+        turn = not turn
+
+    blackOut, whiteOut = outs(cells)
+    whiteWon = blackOut >= 6
+    blackWon = whiteOut >= 6
+    running = ~(whiteWon | blackWon)
+    whiteWins = int(whiteWon.sum())
+    blackWins = int(blackWon.sum())
+    draws = int(running.sum())
+    score = whiteWins + (evaluate(cells[running], scale).sum() if draws else 0)
+    return BatchResult(games, whiteWins, blackWins, draws, float(score) / games)
+
+if __name__ == '__main__':
+    # python rollouts.py [games] [maxMoves] : playouts per second from the standard layout
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    maxMoves = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    board = av.Board.fromGrid(av.STANDARD)
+
+    begin = time.time()
+    result = playouts(board, False, games, maxMoves, seed=0)
+    elapsed = time.time() - begin
+    print(result)
+    print(f"{games} games of {maxMoves} moves in {elapsed:.2f} s, {games * maxMoves / elapsed:.0f} moves/s")
@@ -0,0 +1,241 @@
+import os
+import sys
+import json
+import math
+import time
+import socket
+import threading
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import Abalone_V2 as av
+import main
+
+"""
+    Self-play tournament between engine configurations, fully offline.
+
+    Every player is a real main.py process : it subscribes to the stand-in server of this module on
+    port 3000 (the address main.py uses) and receives its "play" requests through main.fetch, like
+    with the tournament server. Each game has its own two processes, several games run at once.
+    The games are written to a log, one compact JSON object per line, and summarized as Elo
+    differences with their 95% confidence interval.
+"""
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+SERVER = ("127.0.0.1", 3000)
+LOG = "tournament.jsonl"
+
+# a config is a name and the arguments of main.py after the port and the budget : workers, ponder, algorithm, weights, options
+Config = namedtuple("Config", "name args")
+# seconds per player per game and number of plies before the game is adjudicated on the marbles pushed out
+TimeControl = namedtuple("TimeControl", "seconds maxPlies")
+
+# temps accordé en plus du budget avant qu'un coup soit perdu au temps, démarrage et réseau compris
+GRACE = 1.0
+
+def parseConfig(text):
+    """
+        "name=1 0 minimax 1,3000,30,200" -> Config("name", ["1", "0", "minimax", "1,3000,30,200"])
+    """
+    name, _, args = text.partition("=")
+    return Config(name, args.split())
+
+def freePort():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+class StandInServer:
+    """
+        Accepts the "subscribe" requests of the players, remembers the ports that subscribed.
+    """
+    def __init__(self, address=SERVER):
+        self.listener = socket.create_server(address)
+        self.subscribed = set()
+        self.condition = threading.Condition()
+        threading.Thread(target=self.accept, daemon=True).start()
+
+    def accept(self):
+        while True:
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                return
+            with connection:
+                try:
+                    request = main.receiveJSON(connection, 5)
+                    main.sendJSON(connection, {"response": "ok"})
+                # une connexion qui envoie n'importe quoi ne doit pas arrêter ce thread
+                except (main.Timeout, main.NotAJSONObject, main.MessageTooLarge, ValueError, OSError):
+                    continue
+            if request.get("request") == "subscribe" and "port" in request:
+                with self.condition:
+                    self.subscribed.add(request["port"])
+                    self.condition.notify_all()
+
+    def waitFor(self, port, timeout=30):
+        with self.condition:
+            if not self.condition.wait_for(lambda: port in self.subscribed, timeout):
+                raise main.Timeout()
+
+    def close(self):
+        self.listener.close()
+
+def startPlayer(config, port):
+    return subprocess.Popen([sys.executable, MAIN, str(port), "1", *config.args],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def playGame(index, black, white, control, server):
+    """
+        Plays one game, black moves first, and returns its record for the log.\n
+        A player loses on a timeout, an illegal move or when it used more than its time.
+    """
+    configs = [black, white]
+    ports = [freePort(), freePort()]
+    processes = [startPlayer(config, port) for config, port in zip(configs, ports)]
+    # noms uniques : chaque partie a ses propres moteurs dans les processus
+    players = [f"{black.name}#{index}", f"{white.name}#{index}"]
+    used = [0.0, 0.0]
+    board = av.Board.fromGrid(av.STANDARD)
+    turn = False
+    winner = None
+    reason = "cap"
+    plies = 0
+
+    try:
+        for port in ports:
+            server.waitFor(port)
+
+        while plies < control.maxPlies and not board.is_terminal():
+            seat = int(turn)
+            # le temps qui reste est partagé entre les coups qui restent à ce joueur
+            movesLeft = max(1, (control.maxPlies - plies + 1) // 2)
+            budget = max(0.05, (control.seconds - used[seat]) / movesLeft)
+            request = {
+                "request": "play",
+                "lives": 3,
+                "budget": budget,
+                "state": {"players": players, "current": seat, "board": board.toGrid()},
+            }
+
+            begin = time.time()
+            try:
+                response = main.fetch(("127.0.0.1", ports[seat]), request, budget + GRACE)
+            except (main.Timeout, main.NotAJSONObject, OSError):
+                winner, reason = not turn, "timeout"
+                break
+            used[seat] += time.time() - begin
+            if used[seat] > control.seconds + GRACE:
+                winner, reason = not turn, "time"
+                break
+
+            move = response.get("move") or {}
+            if board.action(move.get("marbles", []), move.get("direction"), turn, update=True) is False:
+                winner, reason = not turn, "illegal"
+                break
+            plies += 1
+            turn = not turn
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    blackOut = board.opposingMarblesOut(True)
+    whiteOut = board.opposingMarblesOut(False)
+    if board.is_terminal():
+        winner, reason = board.winner(True), "six"
+    elif reason == "cap" and blackOut != whiteOut:
+        winner = blackOut > whiteOut
+
+    return {
+        "game": index,
+        "black": black.name,
+        "white": white.name,
+        "winner": None if winner is None else ("white" if winner else "black"),
+        "reason": reason,
+        "plies": plies,
+        "out": [blackOut, whiteOut],
+        "seconds": [round(seconds, 2) for seconds in used],
+    }
+
+def schedule(configs, games):
+    """
+        Round robin : games games per pair of configs, the colors alternate.
+    """
+    pairs = [(first, second) for index, first in enumerate(configs) for second in configs[index + 1:]]
+    return [(pair if game % 2 == 0 else pair[::-1]) for pair in pairs for game in range(games)]
+
+def run(configs, games=10, parallel=None, control=TimeControl(60, 200), log=LOG):
+    """
+        Plays the tournament, appends every game to the log as soon as it ends and returns the records.
+    """
+    parallel = parallel or max(1, (os.cpu_count() or 2) // 2)
+    server = StandInServer()
+    records = []
+    lock = threading.Lock()
+    pairings = schedule(configs, games)
+
+    def play(index, black, white):
+        record = playGame(index, black, white, control, server)
+        with lock:
+            records.append(record)
+            with open(log, "a") as file:
+                file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            print(f"{len(records)}/{len(pairings)} {record['black']} - {record['white']} : {record['winner']} ({record['reason']}, {record['plies']} plies)")
+        return record
+
+    try:
+        with ThreadPoolExecutor(parallel) as executor:
+            for future in [executor.submit(play, index, black, white) for index, (black, white) in enumerate(pairings)]:
+                future.result()
+    finally:
+        server.close()
+    return records
+
+def eloDifference(score):
+    """
+        Elo difference giving this expected score, infinite for 0 and 1.
+    """
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return 400 * math.log10(score / (1 - score))
+
+def summarize(records):
+    """
+        One line per pair of configs : the score of the first one and its Elo difference with a 95% interval.
+    """
+    results = {}
+    for record in records:
+        black, white = record["black"], record["white"]
+        score = {"black": 1.0, "white": 0.0, None: 0.5}[record["winner"]]
+        first, second = sorted((black, white))
+        results.setdefault((first, second), []).append(score if black == first else 1 - score)
+
+    lines = []
+    for (first, second), scores in sorted(results.items()):
+        count = len(scores)
+        mean = sum(scores) / count
+        deviation = math.sqrt(sum((score - mean) ** 2 for score in scores) / count)
+        margin = 1.96 * deviation / math.sqrt(count)
+        low = eloDifference(mean - margin)
+        high = eloDifference(mean + margin)
+        lines.append(f"{first} vs {second} : {count} games, score {mean:.3f}, "
+                     f"elo {eloDifference(mean):+.0f} [{low:+.0f}, {high:+.0f}]")
+    return lines
+
+if __name__ == '__main__':
+    # python tournament.py games parallel seconds maxPlies "name=workers ponder algorithm weights" ...
+    # par exemple : python tournament.py 20 2 60 200 "base=1 0 minimax" "center=1 0 minimax 1,3000,30,200"
+    # ou, pour mesurer une option de la recherche : "plain=1 0 minimax 1,2000,30,200 nullMove=0,reductions=0"
+    games = int(sys.argv[1])
+    parallel = int(sys.argv[2])
+    control = TimeControl(float(sys.argv[3]), int(sys.argv[4]))
+    configs = [parseConfig(text) for text in sys.argv[5:]]
+
+    records = run(configs, games, parallel, control)
+    for line in summarize(records):
+        print(line)
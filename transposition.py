@@ -0,0 +1,139 @@
+import random
+import threading
+from collections import namedtuple, OrderedDict
+
+"""
+    Zobrist hashing, transposition table and evaluation cache for minimax.
+
+    The key of a position is the xor of one random number per (color, box), a move only
+    xors the numbers of the boxes it changes so Board keeps its key up to date.
+"""
+
+# graine fixe : les clés sont les mêmes dans tous les processus
+generator = random.Random(0xABA10E)
+
+# indexed like Board.marbles : ZOBRIST[maximizer][box]
+ZOBRIST = [[generator.getrandbits(64) for _ in range(81)] for _ in range(2)]
+# minimax scores depend on the player to move and on the player who maximizes
+ZOBRIST_TURN = generator.getrandbits(64)
+ZOBRIST_MAXIMIZER = generator.getrandbits(64)
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+Entry = namedtuple("Entry", "key depth score bound move age")
+
+def zobristKey(white, black):
+    """
+        Computes the key of a position from scratch.
+    """
+    key = 0
+    for maximizer, mask in ((True, white), (False, black)):
+        while mask:
+            low = mask & -mask
+            key ^= ZOBRIST[maximizer][low.bit_length() - 1]
+            mask ^= low
+    return key
+
+def deltaKey(maximizer, mask):
+    """
+        Key difference of adding or removing the marbles of the mask.
+    """
+    key = 0
+    keys = ZOBRIST[maximizer]
+    while mask:
+        low = mask & -mask
+        key ^= keys[low.bit_length() - 1]
+        mask ^= low
+    return key
+
+class TranspositionTable:
+    """
+        Fixed-size table of searched positions, one entry per slot.\n
+        An entry stores the depth, the score, the bound type (EXACT, LOWER or UPPER) and the best move.\n
+        A slot is replaced when its entry comes from an older search or was searched less deep.
+    """
+    def __init__(self, size=1 << 18):
+        # la taille doit être une puissance de 2 pour indexer avec un masque
+        self.mask = (1 << (size - 1).bit_length()) - 1
+        self.entries = [None] * (self.mask + 1)
+        self.age = 0
+
+    def newSearch(self):
+        """
+            Called once per move played, entries of the previous searches become replaceable.
+        """
+        self.age += 1
+
+    def get(self, key):
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry.key == key:
+            return entry
+        return None
+
+    def put(self, key, depth, score, bound, move):
+        index = key & self.mask
+        entry = self.entries[index]
+        if entry is None or entry.key == key or entry.age != self.age or depth >= entry.depth:
+            self.entries[index] = Entry(key, depth, score, bound, move, self.age)
+
+    def clear(self):
+        self.entries = [None] * (self.mask + 1)
+        self.age = 0
+
+# taille estimée d'une entrée du cache et de chaque move qu'elle garde, en octets (mesurée avec tracemalloc)
+ENTRY_BYTES = 250
+MOVE_BYTES = 200
+
+class EvaluationCache:
+    """
+        Evaluations of positions, bounded in memory and evicted least recently used first.\n
+        A position is keyed by its key with the player to move and the player who maximizes (the tableKey of minimax),
+        the value is its evaluation and its pushes, or None until they are generated.\n
+        It is shared by the engines of all the games of the process, searched in different threads, hence the lock.
+    """
+    def __init__(self, megabytes=64):
+        self.megabytes = megabytes
+        self.capacity = megabytes << 20
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def resize(self, megabytes):
+        """
+            Changes the memory cap, the least recently used entries beyond it are evicted.
+        """
+        with self.lock:
+            self.megabytes = megabytes
+            self.capacity = megabytes << 20
+            while self.bytes > self.capacity:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= ENTRY_BYTES + (MOVE_BYTES * len(evicted) if evicted is not None else 0)
+
+    def get(self, key):
+        """
+            (score, pushes) of the position, None when it is not in the cache.
+        """
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, score, pushes=None):
+        size = ENTRY_BYTES + (MOVE_BYTES * len(pushes) if pushes is not None else 0)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= ENTRY_BYTES + (MOVE_BYTES * len(old[1]) if old[1] is not None else 0)
+            self.entries[key] = (score, pushes)
+            self.bytes += size
+            while self.bytes > self.capacity:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= ENTRY_BYTES + (MOVE_BYTES * len(evicted) if evicted is not None else 0)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0